@@ -0,0 +1,94 @@
+"""
+p50/p99 of Youtube.request against a local stub server with occasional
+stalls, with and without hedging.
+
+    python benchmarks/hedging.py [requests] [stall_rate] [stall_seconds]
+"""
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+import random
+import sys
+import threading
+import time
+from the_sentinel.apis.deadline import LatencyTracker
+from the_sentinel.apis.google.youtube import Youtube
+
+STALL_RATE = 0.02
+STALL_SECONDS = 0.5
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Answers everything with an empty item list, usually quickly
+    """
+    def do_GET(self): # pylint: disable=invalid-name
+        """
+        Fast most of the time, stalled STALL_RATE of the time
+        """
+        if random.random() < STALL_RATE:
+            time.sleep(STALL_SECONDS)
+        else:
+            time.sleep(random.uniform(0.005, 0.015))
+        body = b'{"items": []}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args): # pylint: disable=arguments-differ
+        pass
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+    """
+    One thread per request, so a stalled request doesn't block the hedge
+    """
+    daemon_threads = True
+
+
+def run(port: int, requests: int, hedge: bool):
+    """
+    Makes `requests` sequential requests, returns sorted latencies
+    """
+    class Stub(Youtube):
+        """
+        Youtube pointed at the stub server
+        """
+        API_BASE = f'http://127.0.0.1:{port}'
+        HEDGE = hedge
+        LATENCY = LatencyTracker()
+
+    stub = Stub(id=f'stub-{hedge}')
+    # warm up the p95 estimate
+    for _ in range(50):
+        stub.get('')
+    latencies = []
+    for _ in range(requests):
+        start = time.monotonic()
+        stub.get('')
+        latencies.append(time.monotonic() - start)
+    return sorted(latencies), Stub.LATENCY
+
+
+def main():
+    global STALL_RATE, STALL_SECONDS # pylint: disable=global-statement
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    if len(sys.argv) > 2:
+        STALL_RATE = float(sys.argv[2])
+    if len(sys.argv) > 3:
+        STALL_SECONDS = float(sys.argv[3])
+    server = ThreadingServer(('127.0.0.1', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+    for hedge in (False, True):
+        latencies, tracker = run(port, requests, hedge)
+        p50 = latencies[len(latencies) // 2] * 1000
+        p99 = latencies[int(len(latencies) * 0.99)] * 1000
+        print(f'hedge={hedge!s:5}  p50={p50:6.1f}ms  p99={p99:6.1f}ms  '
+              f'hedged={tracker.hedged} hedge_wins={tracker.hedge_wins}')
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
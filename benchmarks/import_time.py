@@ -0,0 +1,45 @@
+"""
+Cold import time of the_sentinel entry points, each in a fresh interpreter.
+
+    python benchmarks/import_time.py [runs]
+"""
+import statistics
+import subprocess
+import sys
+
+TARGETS = [
+    'import the_sentinel',
+    'from the_sentinel.apis.google.youtube.urls import classify',
+    'from the_sentinel.apis.google.youtube import Video',
+    'from the_sentinel.watchers import RedditWatcher',
+    'import the_sentinel.apis.google.youtube.resolve',
+    ]
+
+TIMER = '''
+import time
+start = time.perf_counter()
+{}
+print(time.perf_counter() - start)
+'''
+
+
+def time_import(statement: str, runs: int) -> float:
+    """
+    Median seconds to run statement in a fresh interpreter
+    """
+    times = []
+    for _ in range(runs):
+        out = subprocess.check_output(
+            [sys.executable, '-c', TIMER.format(statement)])
+        times.append(float(out))
+    return statistics.median(times)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for statement in TARGETS:
+        print(f'{time_import(statement, runs) * 1000:8.1f}ms  {statement}')
+
+
+if __name__ == '__main__':
+    main()
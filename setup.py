@@ -47,10 +47,10 @@ setup(
             'lru-dict'
             ],  # Optional
 
-    # extras_require={  # Optional
-    #     'dev': ['check-manifest'],
-    #     'test': ['coverage'],
-    # },
+    extras_require={  # Optional
+        # reading zstd compressed dumps, see watchers.dumps
+        'dumps': ['zstandard'],
+    },
 
     # package_data={  # Optional
     #     'sample': ['package_data.dat'],
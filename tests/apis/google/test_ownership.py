@@ -0,0 +1,120 @@
+import threading
+import pytest
+from mock import MagicMock
+from the_sentinel.apis.google.youtube import Video, User, Channel
+from the_sentinel.apis.google.youtube.ownership import OwnershipIndex
+
+
+@pytest.fixture
+def index():
+    return OwnershipIndex()
+
+
+@pytest.mark.parametrize('item,video_id,channel_id', [
+    ({'kind': 'youtube#video', 'id': 'v1',
+      'snippet': {'channelId': 'c1'}}, 'v1', 'c1'),
+    ({'kind': 'youtube#searchResult',
+      'id': {'kind': 'youtube#video', 'videoId': 'v2'},
+      'snippet': {'channelId': 'c2'}}, 'v2', 'c2'),
+    ({'kind': 'youtube#playlistItem',
+      'snippet': {'channelId': 'playlist-owner',
+                  'videoOwnerChannelId': 'c3',
+                  'resourceId': {'videoId': 'v3'}}}, 'v3', 'c3'),
+    ])
+def test_record(index, item, video_id, channel_id):
+    index.record([item])
+    assert index.video_channel(video_id) == channel_id
+
+
+def test_record_ignores(index):
+    index.record([
+        # search result for a channel, nothing to learn
+        {'kind': 'youtube#searchResult',
+         'id': {'kind': 'youtube#channel', 'channelId': 'c1'},
+         'snippet': {'channelId': 'c1'}},
+        # playlist item without owner info
+        {'kind': 'youtube#playlistItem',
+         'snippet': {'channelId': 'c2', 'resourceId': {'videoId': 'v2'}}},
+        {'kind': 'youtube#channel', 'id': 'c3'},
+        ])
+    assert len(index) == 0
+
+
+def test_users_case_insensitive(index):
+    index.add_user('SomeName', 'c1')
+    assert index.user_channel('somename') == 'c1'
+
+
+def test_save_load(tmpdir, index):
+    path = str(tmpdir.join('ownership.json.gz'))
+    index.add_video('v1', 'c1')
+    index.add_user('u1', 'c2')
+    index.save(path)
+    loaded = OwnershipIndex(path)
+    assert loaded.video_channel('v1') == 'c1'
+    assert loaded.user_channel('u1') == 'c2'
+    assert not tmpdir.join('ownership.json.gz.tmp').check()
+
+
+def test_save_while_recording(tmpdir, index):
+    path = str(tmpdir.join('ownership.json.gz'))
+
+    def record():
+        for count in range(5000):
+            index.add_video(f'v{count}', 'c1')
+    thread = threading.Thread(target=record)
+    thread.start()
+    while thread.is_alive():
+        index.save(path)
+    thread.join()
+    index.save(path)
+    assert len(OwnershipIndex(path)) == 5000
+
+
+def test_persist(mocker, tmpdir, index):
+    register = mocker.patch('the_sentinel.apis.google.youtube.ownership'
+                            '.atexit.register')
+    path = str(tmpdir.join('ownership.json.gz'))
+    index.persist(path)
+    # nothing to load yet
+    assert len(index) == 0
+    register.assert_called_once_with(index.save)
+    index.add_video('v1', 'c1')
+    index.save()
+    other = OwnershipIndex()
+    other.persist(path, at_exit=False)
+    assert other.video_channel('v1') == 'c1'
+    assert register.call_count == 1
+
+
+def test_save_no_path(index):
+    with pytest.raises(RuntimeError):
+        index.save()
+
+
+def test_video_channel_uses_index(mocker):
+    ownership = mocker.patch('the_sentinel.apis.google.youtube.video.OWNERSHIP',
+                             new=OwnershipIndex())
+    ownership.add_video('indexed-video', 'indexed-channel')
+    mock_get = mocker.patch.object(Video, 'get')
+    assert Video(id='indexed-video').channel == Channel(id='indexed-channel')
+    mock_get.assert_not_called()
+
+
+def test_user_channel_uses_index(mocker):
+    ownership = mocker.patch('the_sentinel.apis.google.youtube.user.OWNERSHIP',
+                             new=OwnershipIndex())
+    ownership.add_user('indexed-user', 'indexed-channel')
+    mock_get = mocker.patch.object(User, 'get')
+    assert User(id='indexed-user').channel == Channel(id='indexed-channel')
+    mock_get.assert_not_called()
+
+
+def test_user_json_records(mocker):
+    ownership = mocker.patch('the_sentinel.apis.google.youtube.user.OWNERSHIP',
+                             new=OwnershipIndex())
+    mock_get = mocker.patch.object(User, 'get')
+    mock_get.return_value.json.return_value = {
+        'items': [{'kind': 'youtube#channel', 'id': 'found-channel'}]}
+    assert User(id='new-user').json['id'] == 'found-channel'
+    assert ownership.user_channel('new-user') == 'found-channel'
@@ -0,0 +1,144 @@
+import threading
+import pytest
+import requests
+from mock import MagicMock
+from the_sentinel.apis.google.youtube import Youtube, Channel, Video, \
+                                             Playlist, User, resolve_links
+from the_sentinel.apis.google.youtube.resolve import classify, \
+                                                     extract_links, item_text
+from the_sentinel.apis.deadline import current_deadline, deadline
+from the_sentinel.tracing import TRACER
+from the_sentinel.apis.google.youtube.ownership import OWNERSHIP
+
+
+@pytest.mark.parametrize('url,target', [
+    ('https://youtu.be/vid1', (Video, 'vid1')),
+    ('https://www.youtube.com/watch?v=vid2&list=pl1', (Video, 'vid2')),
+    ('https://www.youtube.com/channel/chan1', (Channel, 'chan1')),
+    ('https://www.youtube.com/user/name1', (User, 'name1')),
+    ('https://www.youtube.com/playlist?list=pl2', (Playlist, 'pl2')),
+    ('https://example.com/', None),
+    ])
+def test_classify(url, target):
+    assert classify(url) == target
+
+
+def test_extract_links():
+    text = ('look [here](https://youtu.be/vid3) and youtu.be/vid3 and '
+            'https://www.youtube.com/channel/chan2 https://example.com/')
+    assert extract_links(text) == [(Video, 'vid3'), (Channel, 'chan2')]
+
+
+def test_item_text():
+    item = MagicMock(spec=['body'], body='a body')
+    assert item_text(item) == 'a body  '
+    assert item_text('plain') == 'plain'
+
+
+def test_fetch_many(mocker):
+    mock_get = mocker.patch.object(Youtube, 'get')
+    mocker.patch.object(Video, 'BATCH_SIZE', new=2)
+    mock_get.return_value.json.return_value = {'items': [
+        {'kind': 'youtube#video', 'id': 'fm1'},
+        {'kind': 'youtube#video', 'id': 'fm2'},
+        ]}
+    found = Video.fetch_many(['fm1', 'fm2', 'fm1', 'fm3'])
+    # deduped to 3 ids, 2 per request
+    assert mock_get.call_count == 2
+    mock_get.assert_any_call('', params={'id': 'fm1,fm2', 'maxResults': 2})
+    mock_get.assert_any_call('', params={'id': 'fm3', 'maxResults': 1})
+    assert set(found) == {'fm1', 'fm2'}
+    assert found['fm1'].json == {'kind': 'youtube#video', 'id': 'fm1'}
+
+
+def test_chunks(mocker):
+    mocker.patch.object(Video, 'BATCH_SIZE', new=2)
+    assert Video.chunks(['a', 'b', 'a', 'c']) == [['a', 'b'], ['c']]
+    assert User.chunks(['a', 'b']) == [['a'], ['b']]
+
+
+def test_resolve_links(mocker):
+    videos = mocker.patch.object(
+        Video, 'fetch_chunk',
+        return_value={'rv1': MagicMock(channel=Channel(id='rc1'))})
+    playlists = mocker.patch.object(Playlist, 'fetch_chunk', return_value={})
+    users = mocker.patch.object(
+        User, 'fetch_chunk',
+        return_value={'ru1': MagicMock(channel=Channel(id='rc2'))})
+    # fake items are only hashed, they need to be distinct
+    first = MagicMock(spec=['body'],
+                      body='https://youtu.be/rv1 youtu.be/rv-deleted')
+    second = MagicMock(spec=['selftext', 'url'],
+                       selftext='https://www.youtube.com/user/ru1',
+                       url='https://www.youtube.com/channel/rc1')
+    third = 'https://youtu.be/rv1 nothing else'
+    resolved = resolve_links([first, second, third])
+
+    videos.assert_called_once_with(['rv1', 'rv-deleted'])
+    playlists.assert_not_called()
+    users.assert_called_once_with(['ru1'])
+    assert resolved[first] == [Channel(id='rc1')]
+    assert resolved[second] == [Channel(id='rc2'), Channel(id='rc1')]
+    assert resolved[third] == [Channel(id='rc1')]
+
+
+def test_resolve_links_concurrent_chunks(mocker):
+    mocker.patch.object(Video, 'BATCH_SIZE', new=2)
+    # only gets through if all three chunks are in flight at once
+    barrier = threading.Barrier(3, timeout=5)
+
+    def fetch_chunk(ids):
+        barrier.wait()
+        if ids == ['cv3', 'cv4']:
+            raise requests.HTTPError('403 quotaExceeded')
+        return {item_id: MagicMock(channel=Channel(id=f'owner-{item_id}'))
+                for item_id in ids}
+    mocker.patch.object(Video, 'fetch_chunk', side_effect=fetch_chunk)
+    text = ' '.join(f'https://youtu.be/cv{i}' for i in range(1, 6))
+    resolved = resolve_links([text])
+    # the failed chunk is dropped, the others still resolve
+    assert resolved[text] == [Channel(id='owner-cv1'), Channel(id='owner-cv2'),
+                              Channel(id='owner-cv5')]
+
+
+def test_resolve_links_keeps_deadline(mocker):
+    seen = []
+
+    def fetch_chunk(ids):
+        seen.append(current_deadline())
+        return {}
+    mocker.patch.object(Video, 'fetch_chunk', side_effect=fetch_chunk)
+    with deadline(10) as budget:
+        resolve_links(['https://youtu.be/dv1'])
+    assert seen == [budget]
+
+
+def test_resolve_links_traced(mocker):
+    mocker.patch.object(TRACER, 'sample_rate', new=1)
+    resp = MagicMock(status_code=200)
+    resp.json.return_value = {'items': [
+        {'kind': 'youtube#video', 'id': 'tv1',
+         'snippet': {'channelId': 'tracedowner'}}]}
+    mocker.patch('the_sentinel.apis.RestBase.request', return_value=resp)
+    item = MagicMock(spec=['body'], body='https://youtu.be/tv1')
+    trace = TRACER.start('item')
+    TRACER.attach(item, trace)
+    with TRACER.handling(item):
+        resolved = resolve_links([item])
+    assert resolved[item] == [Channel(id='tracedowner')]
+    # the request was made on a pool thread, but still ends up in the trace
+    assert [span.name for span in trace.spans] == \
+        ['queue', 'youtube GET https://www.googleapis.com/youtube/v3/videos']
+    assert trace.end is not None
+
+
+def test_resolve_links_indexed(mocker):
+    OWNERSHIP.add_video('vid00000001', 'UCindexed')
+    OWNERSHIP.add_user('indexedspammer', 'UCindexed')
+    mock_request = mocker.patch('the_sentinel.apis.RestBase.request')
+    text = ('https://youtu.be/vid00000001 '
+            'https://www.youtube.com/user/indexedspammer')
+    resolved = resolve_links([text])
+    assert resolved[text] == [Channel(id='UCindexed')]
+    # answered from the index alone
+    mock_request.assert_not_called()
@@ -0,0 +1,108 @@
+import threading
+import pytest
+from mock import MagicMock
+from the_sentinel.apis.google.youtube import LookupScheduler
+from the_sentinel.apis.google.youtube.scheduler import lookup_priority
+from the_sentinel.apis.deadline import current_deadline, deadline
+
+
+@pytest.fixture
+def scheduler():
+    # no worker threads, jobs are pulled by hand with _next
+    return LookupScheduler(workers=0)
+
+
+@pytest.mark.parametrize('fullname,priority', [
+    ('t3_abc', 'submission'),
+    ('t1_abc', 'comment'),
+    ('t5_abc', 'comment'),
+    ])
+def test_lookup_priority(fullname, priority):
+    item = MagicMock(spec=['fullname'], fullname=fullname)
+    assert lookup_priority(item) == priority
+    # sharded watchers hand over bare fullnames
+    assert lookup_priority(fullname) == priority
+
+
+def test_lookup_priority_unknown():
+    assert lookup_priority(MagicMock(spec=[])) == 'comment'
+    assert lookup_priority('not a reddit item') == 'comment'
+
+
+def drain(scheduler):
+    order = []
+    job = scheduler._next()
+    while job is not None:
+        order.append(job.args[0])
+        job = scheduler._next()
+    return order
+
+
+def test_weighted_order(scheduler):
+    for i in range(20):
+        scheduler.submit(str, 'c', priority='comment')
+    for i in range(8):
+        scheduler.submit(str, 's', priority='submission')
+    order = drain(scheduler)
+    # submissions go 4 to 1 (weights 8:2) until they're all done
+    assert order[:10] == ['s', 's', 's', 's', 'c', 's', 's', 's', 's', 'c']
+    assert scheduler.dispatched == {'submission': 8, 'comment': 20,
+                                    'backfill': 0}
+
+
+def test_idle_class_gets_no_credit(scheduler):
+    for i in range(50):
+        scheduler.submit(str, 's', priority='submission')
+    drain(scheduler)
+    # comments were idle the whole time, that doesn't let them jump ahead of
+    # a new burst of submissions
+    for i in range(4):
+        scheduler.submit(str, 'c', priority='comment')
+        scheduler.submit(str, 's', priority='submission')
+    assert drain(scheduler)[:4].count('s') >= 3
+
+
+def test_aging(scheduler):
+    scheduler.max_wait = 10
+    scheduler.submit(str, 'b', priority='backfill')
+    for i in range(5):
+        scheduler.submit(str, 's', priority='submission')
+    scheduler._queues['backfill'][0].enqueued -= 11
+    assert scheduler._next().args[0] == 'b'
+
+
+def test_cost(scheduler):
+    # an expensive submission lookup is worth a lot of cheap comment ones
+    scheduler.submit(str, 'search', priority='submission', cost=100)
+    scheduler.submit(str, 's', priority='submission')
+    for i in range(3):
+        scheduler.submit(str, 'c', priority='comment')
+    assert drain(scheduler) == ['c', 'c', 'c', 'search', 's']
+
+
+def test_unknown_priority(scheduler):
+    with pytest.raises(RuntimeError):
+        scheduler.submit(str, 'x', priority='nope')
+
+
+def test_runs_jobs():
+    scheduler = LookupScheduler(workers=2, quota_per_second=1000)
+    item = MagicMock(spec=['fullname'], fullname='t3_abc')
+    ok = scheduler.submit_for(item, lambda x: x * 2, 21)
+    bad = scheduler.submit(lambda: 1 / 0)
+    assert ok.result(timeout=5) == 42
+    with pytest.raises(ZeroDivisionError):
+        bad.result(timeout=5)
+    scheduler.shutdown()
+    with pytest.raises(RuntimeError):
+        scheduler.submit(str, 'late')
+
+
+def test_jobs_keep_deadline():
+    scheduler = LookupScheduler(workers=1, quota_per_second=1000)
+    with deadline(10) as budget:
+        inside = scheduler.submit(current_deadline)
+    outside = scheduler.submit(current_deadline)
+    assert inside.result(timeout=5) is budget
+    assert outside.result(timeout=5) is None
+    scheduler.shutdown()
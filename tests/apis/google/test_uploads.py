@@ -0,0 +1,140 @@
+import asyncio
+import pytest
+import requests
+from mock import MagicMock
+from the_sentinel.apis.google.youtube import Youtube, Video, UploadMonitor
+from the_sentinel.apis.google.youtube.ownership import OWNERSHIP
+
+
+def playlist_item(video_id, published):
+    return {'kind': 'youtube#playlistItem',
+            'snippet': {'publishedAt': published,
+                        'resourceId': {'videoId': video_id}}}
+
+
+def channel_item(channel_id):
+    return {'kind': 'youtube#channel', 'id': channel_id,
+            'contentDetails': {'relatedPlaylists':
+                                   {'uploads': 'UU' + channel_id}}}
+
+
+# a poll every 10ms
+DAY_CALLS = 24 * 60 * 60 * 100
+
+
+@pytest.fixture
+def mock_get(mocker):
+    mock_get = mocker.patch.object(Youtube, 'get')
+    responses = {}
+    def get(url, params):
+        resp = MagicMock(name='resp')
+        if url == 'playlistItems':
+            items = responses[params['playlistId']]
+            if isinstance(items, Exception):
+                raise items
+        else:
+            items = [channel_item(channel_id)
+                     for channel_id in params['id'].split(',')
+                     if not channel_id.startswith('gone')]
+        resp.json.return_value = {'items': items}
+        return resp
+    mock_get.side_effect = get
+    mock_get.responses = responses
+    return mock_get
+
+
+def test_resolve_playlists(mocker, mock_get):
+    mocker.patch.object(Youtube, 'BATCH_SIZE', new=2)
+    monitor = UploadMonitor(['up1', 'up2', 'up3'])
+    monitor.resolve_playlists()
+    assert mock_get.call_count == 2
+    mock_get.assert_any_call('', params={'id': 'up1,up2',
+                                         'part': 'contentDetails',
+                                         'maxResults': 2})
+    assert monitor._playlists['up3'] == 'UUup3'
+    # already resolved ones aren't looked up again
+    monitor.resolve_playlists()
+    assert mock_get.call_count == 2
+
+
+def test_poll_high_water_mark(mock_get):
+    monitor = UploadMonitor(['hw1'])
+    mock_get.responses['UUhw1'] = [
+        playlist_item('old2', '2020-01-02T00:00:00Z'),
+        playlist_item('old1', '2020-01-01T00:00:00Z'),
+        ]
+    # first poll only sets the mark
+    assert monitor.poll('hw1') == []
+    mock_get.responses['UUhw1'] = [
+        playlist_item('new2', '2020-01-04T00:00:00Z'),
+        playlist_item('new1', '2020-01-03T00:00:00Z'),
+        playlist_item('old2', '2020-01-02T00:00:00Z'),
+        ]
+    assert monitor.poll('hw1') == [Video(id='new2'), Video(id='new1')]
+    assert monitor.poll('hw1') == []
+    assert OWNERSHIP.video_channel('new1') == 'hw1'
+    mock_get.assert_called_with('playlistItems',
+                                params={'playlistId': 'UUhw1',
+                                        'maxResults': 50})
+
+
+def test_poll_new_channel(mock_get):
+    monitor = UploadMonitor(['nc1'])
+    mock_get.responses['UUnc1'] = []
+    assert monitor.poll('nc1') == []
+    # the first upload after an empty first poll is still new
+    mock_get.responses['UUnc1'] = [playlist_item('first',
+                                                 '2020-01-01T00:00:00Z')]
+    assert monitor.poll('nc1') == [Video(id='first')]
+    assert monitor.poll('nc1') == []
+
+
+def test_poll_unknown_channel(mock_get):
+    monitor = UploadMonitor(['gone1'])
+    assert monitor.poll('gone1') == []
+    assert monitor.poll('gone1') == []
+    # only looked up the once
+    assert mock_get.call_count == 1
+
+
+def test_poll_same_timestamp(mock_get):
+    monitor = UploadMonitor(['ts1'], emit_existing=True)
+    mock_get.responses['UUts1'] = [playlist_item('a', '2020-01-01T00:00:00Z')]
+    assert monitor.poll('ts1') == [Video(id='a')]
+    mock_get.responses['UUts1'] = [playlist_item('b', '2020-01-01T00:00:00Z'),
+                                   playlist_item('a', '2020-01-01T00:00:00Z')]
+    assert monitor.poll('ts1') == [Video(id='b')]
+
+
+def test_poll_next_rotates(mock_get):
+    monitor = UploadMonitor(['rot1', 'rot2'], emit_existing=True)
+    mock_get.responses['UUrot1'] = [playlist_item('r1', '2020-01-01T00:00:00Z')]
+    mock_get.responses['UUrot2'] = [playlist_item('r2', '2020-01-01T00:00:00Z')]
+    assert monitor.poll_next() == [Video(id='r1')]
+    assert monitor.poll_next() == [Video(id='r2')]
+    assert monitor.poll_next() == []
+    monitor.remove('rot1')
+    assert len(monitor) == 1
+    assert UploadMonitor().poll_next() == []
+
+
+@pytest.mark.asyncio
+async def test_watch_survives_errors(mock_get):
+    monitor = UploadMonitor(['err1', 'err2'], calls_per_day=DAY_CALLS,
+                            emit_existing=True)
+    mock_get.responses['UUerr1'] = requests.HTTPError('500')
+    mock_get.responses['UUerr2'] = [playlist_item('e2',
+                                                  '2020-01-01T00:00:00Z')]
+    found = []
+    watching = asyncio.get_event_loop().create_task(
+        monitor.watch(found.append))
+    await asyncio.sleep(0.2)
+    watching.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await watching
+    # err1 failing every time doesn't stop err2 being polled
+    assert found[0] == Video(id='e2')
+
+
+def test_interval():
+    assert UploadMonitor(calls_per_day=8640).interval == 10
@@ -1,6 +1,7 @@
 import pytest
 from pytest_mock import mocker
-from the_sentinel.apis.google.youtube import User
+from the_sentinel.apis.google.youtube import User, Channel
+from the_sentinel.apis.google.youtube.ownership import OWNERSHIP
 import logins
 
 @pytest.fixture
@@ -15,5 +16,9 @@ def test_resp(mocker, user):
     mock_get.assert_called_with('', params={'forUsername': user.id})
 
 
-
-
+def test_fetch_chunk_indexed(mocker):
+    OWNERSHIP.add_user('indexeduser', 'UCindexeduser')
+    mock_request = mocker.patch('the_sentinel.apis.RestBase.request')
+    found = User.fetch_chunk(['indexeduser'])
+    assert found['indexeduser'].channel == Channel(id='UCindexeduser')
+    mock_request.assert_not_called()
@@ -1,8 +1,12 @@
+import time
 import pytest
-from mock import MagicMock
+import requests
+from mock import MagicMock, ANY
 from pytest_mock import mocker
 from the_sentinel.apis.google.youtube import Youtube
 from the_sentinel.apis.google.youtube.youtube import KIND_MAPPING
+from the_sentinel.apis.deadline import deadline, DeadlineExceeded, \
+                                       LatencyTracker
 import logins
 
 
@@ -55,7 +59,8 @@ def test_request(mocker, base_youtube, method, url, params):
         })
     mock_request.assert_called_with(method,
                                     base_youtube.format_url(url),
-                                    params=params)
+                                    params=params,
+                                    timeout=ANY)
 
 @pytest.mark.parametrize('items,endpoint,query,limit,params', [
     ([], 'endpoint', 'query', 5, {}),
@@ -107,3 +112,70 @@ def test_kind_mapping_exaustive():
     assert not possible_params
 
 
+
+
+@pytest.fixture
+def no_sleep(mocker):
+    return mocker.patch('the_sentinel.apis.google.youtube.youtube.time.sleep')
+
+
+def test_request_retries(mocker, base_youtube, no_sleep):
+    mock_request = mocker.patch('the_sentinel.apis.RestBase.request')
+    mock_request.side_effect = [MagicMock(status_code=503),
+                                MagicMock(status_code=200)]
+    mocker.patch.object(Youtube, 'TIMEOUT', new=10)
+    resp = base_youtube.request('GET', '')
+    assert resp.status_code == 200
+    assert mock_request.call_count == 2
+
+
+def test_request_retries_limited(mocker, base_youtube, no_sleep):
+    mock_request = mocker.patch('the_sentinel.apis.RestBase.request')
+    mock_request.return_value = MagicMock(status_code=503)
+    resp = base_youtube.request('GET', '')
+    # gives back the last failure once out of retries
+    assert resp.status_code == 503
+    assert mock_request.call_count == Youtube.RETRIES + 1
+
+
+def test_request_connection_error(mocker, base_youtube, no_sleep):
+    mock_request = mocker.patch('the_sentinel.apis.RestBase.request')
+    mock_request.side_effect = requests.ConnectionError
+    with pytest.raises(requests.ConnectionError):
+        base_youtube.request('GET', '')
+    assert mock_request.call_count == Youtube.RETRIES + 1
+
+
+def test_request_deadline(mocker, base_youtube):
+    mock_request = mocker.patch('the_sentinel.apis.RestBase.request')
+    with deadline(0):
+        with pytest.raises(DeadlineExceeded):
+            base_youtube.request('GET', '')
+    mock_request.assert_not_called()
+    mock_request.side_effect = requests.Timeout
+    with deadline(0.05):
+        with pytest.raises(DeadlineExceeded):
+            base_youtube.request('GET', '', timeout=0.01)
+    # timeout never given more than the budget
+    assert mock_request.call_args[1]['timeout'] <= 0.01
+
+
+def test_request_hedged(mocker, base_youtube):
+    calls = []
+    def slow_then_fast(*args, **kwargs):
+        calls.append(kwargs)
+        if len(calls) == 1:
+            time.sleep(0.3)
+            return MagicMock(status_code=200, name='slow')
+        return MagicMock(status_code=200, name='fast')
+    mocker.patch('the_sentinel.apis.RestBase.request', new=slow_then_fast)
+    latency = LatencyTracker()
+    for _ in range(100):
+        latency.record(0.01)
+    mocker.patch.object(Youtube, 'LATENCY', new=latency)
+    mocker.patch.object(Youtube, 'HEDGE', new=True)
+    resp = base_youtube.request('GET', '')
+    assert len(calls) == 2
+    assert resp._mock_name == 'fast'
+    assert latency.hedged == 1
+    assert latency.hedge_wins == 1
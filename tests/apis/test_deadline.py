@@ -0,0 +1,58 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from the_sentinel.apis.deadline import Deadline, LatencyTracker, backoff, \
+                                       carry, current_deadline, deadline
+
+
+def test_deadline_remaining():
+    budget = Deadline(10)
+    assert 9 < budget.remaining() <= 10
+    assert not budget.expired
+    assert Deadline(-1).remaining() == 0
+    assert Deadline(-1).expired
+
+
+def test_deadline_context():
+    assert current_deadline() is None
+    with deadline(10) as outer:
+        assert current_deadline() is outer
+        # can tighten
+        with deadline(1) as inner:
+            assert current_deadline() is inner
+            assert inner.remaining() <= 1
+        # but not extend
+        with deadline(100) as inner:
+            assert inner is outer
+        assert current_deadline() is outer
+    assert current_deadline() is None
+
+
+def test_carry():
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # nothing to carry outside a deadline block
+        assert carry(current_deadline) is current_deadline
+        with deadline(10) as budget:
+            assert pool.submit(current_deadline).result() is None
+            assert pool.submit(carry(current_deadline)).result() is budget
+        # and the worker doesn't keep it afterwards
+        assert pool.submit(current_deadline).result() is None
+
+
+@pytest.mark.parametrize('attempt', [0, 1, 5, 50])
+def test_backoff(attempt):
+    assert 0 <= backoff(attempt, base=0.1, cap=2) <= min(2, 0.1 * 2 ** attempt)
+
+
+def test_latency_tracker():
+    tracker = LatencyTracker(size=100)
+    assert tracker.percentile(50) is None
+    for latency in range(200):
+        tracker.record(latency)
+    # only the last 100 are kept
+    assert tracker.percentile(0) == 100
+    assert tracker.percentile(50) == 150
+    assert tracker.percentile(99) == 199
+    report = tracker.report()
+    assert report['p50'] == 150
+    assert report['samples'] == 100
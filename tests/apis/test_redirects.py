@@ -0,0 +1,202 @@
+import pytest
+import socket
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from the_sentinel.apis.redirects import RedirectResolver
+from the_sentinel.apis.google.youtube import Channel, resolve_links
+
+
+class Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class Redirects(BaseHTTPRequestHandler):
+    """
+    Stand in shortener. Counts requests per path, and the most that were
+    ever in flight at once
+    """
+    routes = {
+        '/a': (301, '/b'),
+        '/b': (302, 'https://youtu.be/vid1'),
+        '/slow': (301, 'https://youtu.be/slow'),
+        '/chan': (301, 'https://www.youtube.com/channel/chan1'),
+        '/loop': (301, '/loop'),
+        '/dead': (404, None),
+        }
+    hits = {}
+    active = 0
+    most_active = 0
+    lock = threading.Lock()
+
+    def respond(self, head):
+        cls = type(self)
+        with cls.lock:
+            cls.hits[self.path] = cls.hits.get(self.path, 0) + 1
+            cls.active += 1
+            cls.most_active = max(cls.most_active, cls.active)
+        try:
+            if self.path.startswith('/slow'):
+                time.sleep(0.2)
+            if self.path == '/gets' and head:
+                status, location = 405, None
+            elif self.path == '/gets':
+                status, location = 301, 'https://youtu.be/vid2'
+            else:
+                status, location = self.routes[self.path.split('?')[0]]
+            self.send_response(status)
+            if location:
+                self.send_header('Location', location)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def do_HEAD(self):
+        self.respond(True)
+
+    def do_GET(self):
+        self.respond(False)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    Redirects.hits = {}
+    Redirects.most_active = 0
+    httpd = Server(('127.0.0.1', 0), Redirects)
+    thread = threading.Thread(target=httpd.serve_forever, args=(0.05,),
+                              daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_address[1]}'
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def resolver():
+    resolver = RedirectResolver(domains={'127.0.0.1'})
+    yield resolver
+    resolver.close()
+
+
+def test_expand_chain(server, resolver):
+    assert resolver.expand(f'{server}/a') == 'https://youtu.be/vid1'
+    # stops at youtube rather than following it
+    assert Redirects.hits == {'/a': 1, '/b': 1}
+
+
+def test_expand_not_short(resolver):
+    assert resolver.expand('https://youtu.be/vid1') == 'https://youtu.be/vid1'
+    assert resolver.requests == 0
+
+
+def test_head_refused(server, resolver):
+    assert resolver.expand(f'{server}/gets') == 'https://youtu.be/vid2'
+
+
+def test_no_redirect(server, resolver):
+    assert resolver.expand(f'{server}/dead') == f'{server}/dead'
+
+
+def test_redirect_loop(server, resolver):
+    resolver.max_redirects = 3
+    assert resolver.expand(f'{server}/loop') is None
+    assert Redirects.hits['/loop'] == 3
+
+
+def test_cache(server, resolver):
+    url = f'{server}/a'
+    resolver.expand(url)
+    assert resolver.cached(url) == (True, 'https://youtu.be/vid1')
+    resolver.expand(url)
+    assert Redirects.hits['/a'] == 1
+    resolver.ttl = -1
+    resolver._cache.clear()
+    resolver.expand(url)
+    assert resolver.cached(url) == (False, None)
+    resolver.expand(url)
+    assert Redirects.hits['/a'] == 3
+
+
+def test_negative_cache(resolver):
+    # nothing listening there
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    url = f'http://127.0.0.1:{sock.getsockname()[1]}/a'
+    sock.close()
+    assert resolver.expand(url) is None
+    assert resolver.cached(url) == (True, None)
+    resolver.expand(url)
+    assert resolver.requests == 1
+
+
+def test_single_flight(server, resolver):
+    url = f'{server}/slow'
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        resolver.expand(url))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == ['https://youtu.be/slow'] * 5
+    assert Redirects.hits == {'/slow': 1}
+
+
+def test_expand_many_per_domain(server):
+    resolver = RedirectResolver(domains={'127.0.0.1'}, per_domain=2)
+    urls = [f'{server}/slow?{i}' for i in range(6)] * 2
+    results = resolver.expand_many(urls)
+    resolver.close()
+    assert len(results) == 6
+    assert set(results.values()) == {'https://youtu.be/slow'}
+    assert sum(Redirects.hits.values()) == 6
+    assert Redirects.most_active <= 2
+
+
+def test_resolve_links(server, resolver):
+    text = f'cheap views {server}/chan and {server}/chan again'
+    resolved = resolve_links([text], redirects=resolver)
+    assert resolved == {text: [Channel(id='chan1')]}
+    assert Redirects.hits == {'/chan': 1}
+
+
+@pytest.mark.parametrize('text,found', [
+    ('https://bit.ly/abc', ['https://bit.ly/abc']),
+    ('watch bit.ly/xyz now', ['https://bit.ly/xyz']),
+    ('(www.bit.ly/xyz)', ['https://www.bit.ly/xyz']),
+    # needs a path to be taken as a link at all
+    ('bit.ly is a shortener', []),
+    ('someone@bit.ly/xyz', []),
+    ('https://example.com/bit.ly/xyz', []),
+    ])
+def test_find(text, found):
+    resolver = RedirectResolver()
+    assert resolver.find(text) == found
+    resolver.close()
+
+
+def test_resolve_bare_links(server, resolver):
+    resolver.SCHEME = 'http'
+    # as in 'cheap views 127.0.0.1:1234/chan'
+    text = f'cheap views {server[len("http://"):]}/chan'
+    resolved = resolve_links([text], redirects=resolver)
+    assert resolved == {text: [Channel(id='chan1')]}
+    assert Redirects.hits == {'/chan': 1}
+
+
+def test_resolve_links_off_youtube(mocker, resolver):
+    mocker.patch.object(resolver, 'expand_many', return_value={
+        'https://127.0.0.1/vimeo': 'https://vimeo.com/watch?v=abc123',
+        'https://127.0.0.1/tweet': 'https://twitter.com/user/status/1',
+        })
+    mock_request = mocker.patch('the_sentinel.apis.RestBase.request')
+    text = 'https://127.0.0.1/vimeo and https://127.0.0.1/tweet'
+    # neither is a youtube link, so nothing is looked up
+    assert resolve_links([text], redirects=resolver) == {text: []}
+    mock_request.assert_not_called()
@@ -0,0 +1,54 @@
+import pytest
+from mock import MagicMock
+from the_sentinel.detectors import BurstDetector, BurstSettings, Burst
+
+
+@pytest.fixture
+def detector():
+    settings = BurstSettings(window=600, min_links=5, min_subreddits=3,
+                             min_authors=3)
+    return BurstDetector(MagicMock(name='callback'), settings)
+
+
+def test_burst(detector):
+    for i in range(4):
+        assert detector.observe('ring', f'sub{i % 3}', f'author{i}',
+                                now=1000 + i) is None
+    burst = detector.observe('ring', 'sub0', 'author4', now=1005)
+    assert burst == Burst('ring', 5, pytest.approx(3, abs=0.5),
+                          pytest.approx(5, abs=0.5))
+    detector.callback.assert_called_once_with(burst)
+    # cooldown
+    assert detector.observe('ring', 'sub1', 'author5', now=1006) is None
+    assert detector.callback.call_count == 1
+
+
+def test_one_subreddit_isnt_a_burst(detector):
+    for i in range(20):
+        detector.observe('popular', 'music', f'author{i}', now=1000 + i)
+    detector.callback.assert_not_called()
+
+
+def test_old_links_slide_out(detector):
+    for i in range(4):
+        detector.observe('slow', f'sub{i}', f'author{i}', now=1000 + i)
+    # the first four are out of the window by now
+    assert detector.observe('slow', 'sub4', 'author4', now=2000) is None
+    detector.callback.assert_not_called()
+
+
+def test_observe_item(detector):
+    channels = [MagicMock(id='ring'), MagicMock(id='other')]
+    bursts = ()
+    for i in range(5):
+        item = MagicMock(subreddit=f'Sub{i}', author=f'Author{i}',
+                         created_utc=1000 + i)
+        bursts = detector.observe_item(item, channels)
+    assert [burst.channel_id for burst in bursts] == ['ring', 'other']
+
+
+def test_default_settings():
+    detector = BurstDetector(MagicMock(name='callback'))
+    assert detector.settings == BurstSettings()
+    # cooldown defaults to the window
+    assert detector.cooldown == 600
@@ -0,0 +1,48 @@
+import pytest
+from the_sentinel.detectors.sketch import SlidingCountMin, SlidingHyperLogLog
+
+
+def test_count_min():
+    sketch = SlidingCountMin(window=100, buckets=10, width=256, depth=4)
+    for i in range(50):
+        sketch.add('hot', 1000 + i)
+    for i in range(500):
+        sketch.add(f'cold{i}', 1000 + i % 50)
+    # never undercounts, and with this little traffic barely overcounts
+    assert 50 <= sketch.estimate('hot', 1049) <= 55
+    assert sketch.estimate('never seen', 1049) <= 5
+
+
+def test_count_min_window():
+    sketch = SlidingCountMin(window=100, buckets=10)
+    sketch.add('key', 1000)
+    sketch.add('key', 1050)
+    assert sketch.estimate('key', 1050) == 2
+    # the first one has slid out
+    assert sketch.estimate('key', 1105) == 1
+    assert sketch.estimate('key', 1500) == 0
+    # its slot has been reused since, too old to count any more
+    sketch.add('key', 1105)
+    sketch.add('key', 1000)
+    assert sketch.estimate('key', 1105) == 2
+
+
+@pytest.mark.parametrize('distinct', [1, 5, 50, 1000, 5000])
+def test_hyperloglog(distinct):
+    sketch = SlidingHyperLogLog(window=100, buckets=10, precision=8)
+    for i in range(distinct):
+        # duplicates don't count
+        sketch.add(str(i), 1000)
+        sketch.add(str(i), 1001)
+    assert abs(sketch.count(1001) - distinct) <= max(1, distinct * 0.15)
+
+
+def test_hyperloglog_window():
+    sketch = SlidingHyperLogLog(window=100, buckets=10)
+    for i in range(20):
+        sketch.add(f'early{i}', 1000)
+    for i in range(5):
+        sketch.add(f'late{i}', 1090)
+    assert sketch.count(1090) == pytest.approx(25, abs=2)
+    assert sketch.count(1150) == pytest.approx(5, abs=1)
+    assert sketch.count(2000) == 0
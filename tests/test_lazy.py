@@ -0,0 +1,33 @@
+import subprocess
+import sys
+import pytest
+import the_sentinel
+from the_sentinel.apis.google.youtube.youtube import kind_class, KINDS
+
+
+def test_url_only_import_is_light():
+    """
+    url matching shouldn't pull in praw or requests
+    """
+    out = subprocess.check_output([sys.executable, '-c', (
+        'import sys\n'
+        'from the_sentinel.apis.google.youtube.urls import classify\n'
+        'print("praw" in sys.modules, "requests" in sys.modules)\n'
+        )])
+    assert out.split() == [b'False', b'False']
+
+
+def test_lazy_attributes():
+    from the_sentinel.watchers.reddit import RedditWatcher
+    assert the_sentinel.watchers.RedditWatcher is RedditWatcher
+    assert 'RedditWatcher' in dir(the_sentinel.watchers)
+    with pytest.raises(AttributeError):
+        the_sentinel.watchers.NotAThing
+
+
+def test_kind_registry():
+    from the_sentinel.apis.google.youtube import Video, Channel, User
+    assert kind_class('youtube#video') is Video
+    # User inherits KIND from Channel but mustn't replace it
+    assert KINDS['youtube#channel'] is Channel
+    assert User not in KINDS.values()
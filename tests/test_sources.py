@@ -0,0 +1,14 @@
+from mock import MagicMock
+from the_sentinel.sources import item_source, tag, BACKFILL, LIVE
+
+
+def test_item_source():
+    item = MagicMock(spec=['fullname'])
+    assert item_source(item) == LIVE
+    assert tag(item, BACKFILL) is item
+    assert item_source(item) == BACKFILL
+
+
+def test_tag_untaggable():
+    assert tag('t3_a', BACKFILL) == 't3_a'
+    assert item_source('t3_a') == LIVE
@@ -0,0 +1,113 @@
+import io
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from the_sentinel.tracing import Tracer, Trace
+
+
+@pytest.fixture
+def tracer():
+    return Tracer(sample_rate=1, keep=2)
+
+
+def test_off_by_default():
+    tracer = Tracer()
+    assert tracer.start('anything') is None
+    with tracer.span('nothing') as span:
+        assert span is None
+    assert tracer.resume('item') is None
+    assert tracer.slowest() == []
+
+
+def test_item_flow(tracer):
+    trace = tracer.start('sub')
+    with tracer.span('fetch', trace):
+        pass
+    item = object()
+    tracer.attach(item, trace)
+    assert tracer.resume(item) is trace
+    # taking the next item doesn't finish it
+    tracer.resume(object())
+    assert tracer.slowest() == []
+    with tracer.handling(item) as traces:
+        assert traces == (trace,)
+        assert tracer.current() == (trace,)
+        # spans without an explicit trace go to the current one
+        with tracer.span('youtube GET videos'):
+            pass
+    # the end of the block finishes it
+    assert tracer.current() == ()
+    assert tracer.slowest() == [trace]
+    assert [span['name'] for span in trace.to_dict()['spans']] == \
+        ['fetch', 'queue', 'youtube GET videos']
+    assert all(span.end is not None for span in trace.spans)
+
+
+def test_handling_batch(tracer):
+    items = [object() for _ in range(3)]
+    traces = [tracer.start(), None, tracer.start()]
+    for item, trace in zip(items, traces):
+        tracer.attach(item, trace)
+    with tracer.handling(*items) as current:
+        assert current == (traces[0], traces[2])
+        with tracer.span('shared'):
+            pass
+    assert traces[0].spans[-1] is traces[2].spans[-1]
+    assert sorted(tracer.slowest(), key=id) == sorted(current, key=id)
+
+
+def test_carry(tracer):
+    item = object()
+    trace = tracer.start()
+    tracer.attach(item, trace)
+    def record(name):
+        with tracer.span(name):
+            pass
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with tracer.handling(item):
+            pool.submit(tracer.carry(record), 'worker').result()
+            pool.submit(record, 'lost').result()
+        # the worker doesn't keep it afterwards
+        assert pool.submit(tracer.current).result() == ()
+    assert [span.name for span in trace.spans] == ['queue', 'worker']
+
+
+def test_keeps_slowest(tracer):
+    traces = []
+    for delay in (0.03, 0.0, 0.02):
+        trace = tracer.start()
+        time.sleep(delay)
+        tracer.finish(trace)
+        traces.append(trace)
+    assert tracer.slowest() == [traces[0], traces[2]]
+
+
+def test_dump(tracer):
+    trace = tracer.start('label')
+    tracer.finish(trace)
+    out = io.StringIO()
+    dumped = json.loads(tracer.dump(out))
+    assert dumped[0]['label'] == 'label'
+    assert json.loads(out.getvalue()) == dumped
+
+
+def test_attached_is_bounded(tracer):
+    tracer.max_attached = 2
+    items = [object() for _ in range(3)]
+    for item in items:
+        tracer.attach(item, tracer.start())
+    assert tracer.resume(items[0]) is None
+    assert tracer.resume(items[2]) is not None
+
+
+def test_signal_handler(mocker, tracer):
+    mock_signal = mocker.patch('the_sentinel.tracing.signal.signal')
+    out = io.StringIO()
+    tracer.install_signal_handler(out=out)
+    handler = mock_signal.call_args[0][1]
+    # the signal can land while the main thread holds the lock
+    with tracer._lock:
+        dumping = handler(None, None)
+    dumping.join(timeout=5)
+    assert json.loads(out.getvalue()) == []
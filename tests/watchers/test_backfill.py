@@ -0,0 +1,82 @@
+import pytest
+import asyncio
+from mock import MagicMock
+from the_sentinel.watchers.backfill import BackfillWatcher
+from the_sentinel.sources import item_source, BACKFILL, LIVE
+from the_sentinel.watchers.reddit import RedditWatcher, BACKFILL_QUEUE
+from the_sentinel.apis.google.youtube.scheduler import lookup_priority
+
+
+class Item:
+    def __init__(self, fullname):
+        self.fullname = fullname
+
+
+def fake_reddit(missing=()):
+    reddit = MagicMock(name='reddit')
+    def info(fullnames):
+        assert len(fullnames) <= 100
+        return (Item(name) for name in fullnames if name not in missing)
+    reddit.info.side_effect = info
+    return reddit
+
+
+def fullnames(count):
+    return (f't1_{i}' for i in range(count))
+
+
+@pytest.mark.asyncio
+async def test_backfill_chunks():
+    reddit = fake_reddit(missing={'t1_5'})
+    watcher = BackfillWatcher(reddit, fullnames(250))
+    await watcher.watch()
+    assert reddit.info.call_count == 3
+    assert watcher.fetched == 249
+    assert watcher.missing == 1
+    items = [watcher._outqueue.get_nowait() for _ in range(249)]
+    # order is kept even though chunks are fetched concurrently
+    assert [item.fullname for item in items][:6] == \
+        ['t1_0', 't1_1', 't1_2', 't1_3', 't1_4', 't1_6']
+    assert all(item_source(item) == BACKFILL for item in items)
+
+
+@pytest.mark.asyncio
+async def test_backfill_callback():
+    watcher = BackfillWatcher(fake_reddit(), ['t3_a', 't1_b'])
+    await watcher.watch(item_callback=lambda item: item.fullname)
+    assert watcher._outqueue.get_nowait() == 't3_a'
+    assert watcher._outqueue.get_nowait() == 't1_b'
+    # whatever the callback makes of an item is tagged too, if it can be
+    watcher = BackfillWatcher(fake_reddit(), ['t3_a'])
+    await watcher.watch(item_callback=lambda item: Item(item.fullname))
+    assert item_source(watcher._outqueue.get_nowait()) == BACKFILL
+
+
+@pytest.mark.asyncio
+async def test_backfill_kill():
+    watcher = BackfillWatcher(fake_reddit(), fullnames(1000), prefetch=1)
+    watcher.kill()
+    await watcher.watch()
+    assert watcher._outqueue.empty()
+
+
+def test_priority():
+    item = Item('t3_a')
+    assert item_source(item) == LIVE
+    assert lookup_priority(item) == 'submission'
+    item.sentinel_source = BACKFILL
+    assert lookup_priority(item) == 'backfill'
+
+
+@pytest.mark.asyncio
+async def test_redditwatcher_backfill():
+    redditwatcher = RedditWatcher(reddit=fake_reddit())
+    watcher = redditwatcher.backfill(fullnames(3))
+    batch = await redditwatcher.get_batch(max_items=3)
+    assert [item.fullname for item in batch] == ['t1_0', 't1_1', 't1_2']
+    assert redditwatcher.backfills == [watcher]
+    # apart from any subreddit that happens to be called backfill
+    assert watcher._outqueue.key == BACKFILL_QUEUE
+    assert redditwatcher._outqueue.subqueue('backfill') \
+        is not watcher._outqueue
+    assert await redditwatcher.shutdown() == []
@@ -0,0 +1,108 @@
+import json
+import pytest
+from the_sentinel.watchers import dumps
+from the_sentinel.watchers.dumps import DumpItem, DumpWatcher, read_dump, \
+                                        split, replay
+from the_sentinel.sources import item_source, BACKFILL
+from the_sentinel.watchers.reddit import RedditWatcher
+from mock import MagicMock
+
+
+def comment(i):
+    return {'id': f'c{i}', 'body': f'comment {i} https://youtu.be/abc',
+            'author': 'someone', 'subreddit': 'videos',
+            'created_utc': 1500000000 + i}
+
+
+@pytest.fixture
+def dump(tmpdir):
+    path = tmpdir.join('RC_2017-01')
+    lines = [json.dumps(comment(i)) for i in range(500)]
+    # the odd broken line shows up in real dumps
+    lines.insert(100, '{"id": "trunc')
+    lines.insert(200, '')
+    path.write('\n'.join(lines) + '\n')
+    return str(path)
+
+
+def test_dump_item():
+    item = DumpItem(comment(1))
+    assert item.fullname == 't1_c1'
+    assert item.subreddit == 'videos'
+    assert item.title is None
+    assert item_source(item) == BACKFILL
+    submission = DumpItem({'id': 'abc', 'title': 'hi', 'url': 'x'})
+    assert submission.fullname == 't3_abc'
+    assert DumpItem({'name': 't3_abc'}).fullname == 't3_abc'
+
+
+def test_read_dump(dump):
+    items = list(read_dump(dump))
+    assert [item.id for item in items] == [f'c{i}' for i in range(500)]
+
+
+def test_split_offsets(dump):
+    parts = split([dump], part_size=1000)
+    assert len(parts) > 10
+    ids = [item.id for part in parts for item in read_dump(*part)]
+    # every line once, whatever the offsets cut through
+    assert ids == [f'c{i}' for i in range(500)]
+
+
+def test_split_compressed(tmpdir):
+    path = tmpdir.join('RC_2017-01.zst')
+    path.write('')
+    assert split([str(path)], part_size=1) == [(str(path), 0, None)]
+    with pytest.raises(RuntimeError):
+        list(read_dump(str(path), 10, 20))
+
+
+def test_zstd(tmpdir):
+    zstandard = pytest.importorskip('zstandard')
+    path = tmpdir.join('RC_2017-01.zst')
+    data = '\n'.join(json.dumps(comment(i)) for i in range(10)).encode()
+    path.write_binary(zstandard.ZstdCompressor().compress(data))
+    assert len(list(read_dump(str(path)))) == 10
+
+
+def test_zstd_missing(mocker, tmpdir):
+    mocker.patch.dict('sys.modules', {'zstandard': None})
+    path = tmpdir.join('RC_2017-01.zst')
+    path.write('')
+    with pytest.raises(RuntimeError):
+        list(read_dump(str(path)))
+
+
+def even(item):
+    number = int(item.id[1:])
+    return number if number % 2 == 0 else None
+
+
+def test_replay(dump):
+    assert sorted(replay([dump], even, processes=1, part_size=1000)) == \
+        list(range(0, 500, 2))
+
+
+def test_replay_processes(dump):
+    assert sorted(replay([dump], even, processes=2, part_size=1000)) == \
+        list(range(0, 500, 2))
+
+
+@pytest.mark.asyncio
+async def test_dump_watcher(dump):
+    watcher = DumpWatcher([dump], batch_size=64)
+    await watcher.watch(item_callback=lambda item: item.id)
+    assert watcher.read == 500
+    assert watcher._outqueue.qsize() == 500
+    assert watcher._outqueue.get_nowait() == 'c0'
+
+
+@pytest.mark.asyncio
+async def test_redditwatcher_replay(dump):
+    redditwatcher = RedditWatcher(reddit=MagicMock())
+    watcher = redditwatcher.replay([dump])
+    watcher.max_pending = 10
+    batch = await redditwatcher.get_batch(max_items=5)
+    assert [item.id for item in batch] == ['c0', 'c1', 'c2', 'c3', 'c4']
+    leftover = await redditwatcher.shutdown(drain=False)
+    assert len(leftover) < 500
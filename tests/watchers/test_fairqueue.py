@@ -0,0 +1,104 @@
+import asyncio
+import pytest
+from the_sentinel.watchers.fairqueue import FairQueue
+
+
+@pytest.fixture
+def queue():
+    return FairQueue()
+
+
+def drain(queue):
+    out = []
+    while not queue.empty():
+        out.append(queue.get_nowait())
+    return out
+
+
+def test_round_robin(queue):
+    for i in range(100):
+        queue.put_nowait('noisy', f'n{i}')
+    queue.put_nowait('quiet', 'q0')
+    queue.put_nowait('quiet', 'q1')
+    # quiet items don't wait behind the whole noisy backlog
+    assert drain(queue)[:5] == ['n0', 'q0', 'n1', 'q1', 'n2']
+
+
+def test_weights(queue):
+    queue.set_weight('big', 3)
+    queue.set_weight('small', 0.5)
+    for i in range(20):
+        queue.put_nowait('big', 'b')
+        queue.put_nowait('small', 's')
+    # small gets one item every other round
+    assert ''.join(drain(queue)[:14]) == 'bbbbbbsbbbbbbs'
+    with pytest.raises(RuntimeError):
+        queue.set_weight('big', 0)
+    # constructor weights get the same check, 0 would spin get() forever
+    with pytest.raises(RuntimeError):
+        FairQueue({'a': 0})
+    with pytest.raises(RuntimeError):
+        FairQueue(default_weight=-1)
+    assert FairQueue({'a': 2}).weight('a') == 2
+
+
+def test_depths_and_stats(queue):
+    queue.put_nowait('a', 1)
+    queue.put_nowait('a', 2)
+    queue.put_nowait('b', 3)
+    assert queue.depths() == {'a': 2, 'b': 1}
+    assert queue.qsize() == 3
+    queue.get_nowait()
+    assert queue.stats()['a'] == {'depth': 1, 'max_depth': 2,
+                                  'puts': 2, 'gets': 1}
+    drain(queue)
+    assert queue.depths() == {}
+
+
+def test_subqueue(queue):
+    sub = queue.subqueue('a')
+    assert queue.subqueue('a') is sub
+    sub.put_nowait(1)
+    queue.put_nowait('b', 2)
+    assert sub.qsize() == 1
+    assert sub.get_nowait() == 1
+    assert sub.empty()
+    with pytest.raises(asyncio.QueueEmpty):
+        sub.get_nowait()
+    assert not queue.empty()
+
+
+def test_get_nowait_empty(queue):
+    with pytest.raises(asyncio.QueueEmpty):
+        queue.get_nowait()
+
+
+@pytest.mark.asyncio
+async def test_get_waits(queue):
+    loop = asyncio.get_event_loop()
+    loop.call_later(0.01, queue.put_nowait, 'a', 'item')
+    assert await queue.get() == 'item'
+
+
+@pytest.mark.asyncio
+async def test_keyed_get_waits(queue):
+    sub = queue.subqueue('a')
+    waiting = asyncio.get_event_loop().create_task(sub.get())
+    await asyncio.sleep(0)
+    # other keys don't satisfy it
+    queue.put_nowait('b', 'other')
+    await asyncio.sleep(0)
+    assert not waiting.done()
+    await sub.put('mine')
+    assert await waiting == 'mine'
+    assert queue.get_nowait() == 'other'
+
+
+@pytest.mark.asyncio
+async def test_cancelled_getter(queue):
+    waiting = asyncio.get_event_loop().create_task(queue.get())
+    await asyncio.sleep(0)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert queue._getters == []
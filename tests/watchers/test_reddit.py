@@ -2,9 +2,12 @@ import pytest
 from pytest_mock import mocker
 from mock import call, MagicMock
 from the_sentinel.watchers.reddit import SubredditWatcher, RedditWatcher
+from the_sentinel.watchers.executors import reddit_executor
+from the_sentinel.tracing import TRACER
 import logins
 import praw
 import asyncio
+import threading
 from asynctest import CoroutineMock
 
 def reddit():
@@ -81,10 +84,118 @@ def test_add_watcher(mocker, redditwatcher):
     subredditwatcher_mock = mocker.patch(
             'the_sentinel.watchers.reddit.SubredditWatcher')
     redditwatcher.add_watcher('fake_subreddit')
-    subredditwatcher_mock.assert_called_with(redditwatcher.reddit,
-                                             'fake_subreddit',
-                                             redditwatcher._outqueue)
+    subredditwatcher_mock.assert_called_with(
+        redditwatcher.reddit,
+        'fake_subreddit',
+        redditwatcher._outqueue.subqueue('fake_subreddit'))
     with pytest.raises(RuntimeError):
         redditwatcher.add_watcher('fake_subreddit')
 
 
+
+def slow_stream(**kwargs):
+    import time
+    yield 'a'
+    # a stream stuck waiting on reddit
+    time.sleep(0.5)
+    yield 'b'
+
+@pytest.mark.asyncio
+async def test_subwatcher_shutdown(subwatcher):
+    subwatcher._streams = [slow_stream]
+    await subwatcher.watch()
+    await asyncio.sleep(0.1)
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    leftover = await subwatcher.shutdown(timeout=0.2, drain=False)
+    # didn't wait for the stuck stream
+    assert loop.time() - start < 0.4
+    assert leftover == ['a']
+    assert all(task.done() for task in subwatcher.tasks)
+
+@pytest.mark.asyncio
+async def test_subwatcher_shutdown_keeps_running_fetch(subwatcher):
+    subwatcher._streams = [slow_stream]
+    await subwatcher.watch(item_callback=str.upper)
+    await asyncio.sleep(0.1)
+    # 'b' is still being fetched when the watcher is killed
+    leftover = await subwatcher.shutdown(timeout=1, drain=False)
+    assert leftover == ['A']
+    leftover = await subwatcher.shutdown(timeout=1)
+    assert leftover == ['B']
+
+@pytest.mark.asyncio
+async def test_streams_share_reddit_thread(redditwatcher):
+    threads = set()
+
+    def stream(**kwargs):
+        for item in range(3):
+            threads.add(threading.current_thread())
+            yield item
+    for subreddit in ('thirdegree', 'other'):
+        # distinct functions, a watcher won't watch the same one twice
+        redditwatcher.add_watcher(subreddit)._streams = [
+            lambda **kwargs: stream(), lambda **kwargs: stream()]
+    redditwatcher.watch()
+    assert len(await redditwatcher.get_batch(max_items=12, max_wait=1)) == 12
+    assert threads == {reddit_executor(redditwatcher.reddit)._threads.pop()}
+    assert reddit_executor(redditwatcher.reddit) is not \
+        reddit_executor(reddit())
+
+@pytest.mark.asyncio
+async def test_redditwatcher_shutdown_drain(redditwatcher):
+    watcher = SubredditWatcher(redditwatcher.reddit, 'thirdegree',
+                               redditwatcher._outqueue.subqueue('thirdegree'))
+    watcher._streams = [slow_stream]
+    redditwatcher.watchers = [watcher]
+    redditwatcher.watch()
+    await asyncio.sleep(0.1)
+
+    async def consume():
+        return await redditwatcher.get()
+    consumer = asyncio.get_event_loop().create_task(consume())
+    leftover = await redditwatcher.shutdown(timeout=0.2)
+    # consumer got the in flight item during the drain
+    assert leftover == []
+    assert await consumer == 'a'
+
+@pytest.mark.asyncio
+async def test_get_batch_size(redditwatcher):
+    for item in range(5):
+        redditwatcher._outqueue.put_nowait('thirdegree', item)
+    assert await redditwatcher.get_batch(max_items=3, max_wait=10) == [0, 1, 2]
+    assert await redditwatcher.get_batch(max_items=3, max_wait=0) == [3, 4]
+
+@pytest.mark.asyncio
+async def test_get_batch_traces(mocker, redditwatcher):
+    mocker.patch.object(TRACER, 'sample_rate', new=1)
+    items = [MagicMock(name=f'item{i}') for i in range(2)]
+    traces = [TRACER.start(), TRACER.start()]
+    for item, trace in zip(items, traces):
+        TRACER.attach(item, trace)
+        redditwatcher._outqueue.put_nowait('thirdegree', item)
+    batch = await redditwatcher.get_batch(max_items=2, max_wait=0)
+    # out of the queue, but not finished until they've been handled
+    assert all(trace.spans[-1].end is not None for trace in traces)
+    assert all(trace.end is None for trace in traces)
+    with TRACER.handling(*batch) as handled:
+        assert handled == tuple(traces)
+    assert all(trace.end is not None for trace in traces)
+
+@pytest.mark.asyncio
+async def test_get_batch_wait(subwatcher):
+    loop = asyncio.get_event_loop()
+    loop.call_later(0.05, subwatcher._outqueue.put_nowait, 'a')
+    loop.call_later(0.1, subwatcher._outqueue.put_nowait, 'b')
+    loop.call_later(0.5, subwatcher._outqueue.put_nowait, 'late')
+    # waits for the first item, then up to max_wait for more
+    assert await subwatcher.get_batch(max_items=10, max_wait=0.2) == ['a', 'b']
+    assert await subwatcher.get_batch(max_items=10, max_wait=0) == ['late']
+
+@pytest.mark.asyncio
+async def test_batches(redditwatcher):
+    for item in range(4):
+        redditwatcher._outqueue.put_nowait('thirdegree', item)
+    batches = redditwatcher.batches(max_items=2, max_wait=0)
+    assert await batches.__anext__() == [0, 1]
+    assert await batches.__anext__() == [2, 3]
@@ -0,0 +1,105 @@
+import asyncio
+import queue
+import pytest
+from mock import MagicMock, call
+from the_sentinel.watchers.sharded import ShardedRedditWatcher, shard_for
+from the_sentinel.watchers.reddit import RedditWatcher
+import logins
+
+
+@pytest.fixture
+def sharded(mocker):
+    watcher = ShardedRedditWatcher(logins.PRAW, shards=2)
+    mocker.patch.object(watcher, '_ctx')
+    # distinct queues/processes per shard
+    watcher._ctx.Queue.side_effect = lambda: MagicMock(name='commands')
+    watcher._ctx.Process.side_effect = lambda **kwargs: MagicMock(
+        name='process', **{'is_alive.return_value': True})
+    return watcher
+
+
+def test_shard_for():
+    assert shard_for('Thirdegree', 4) == shard_for('thirdegree', 4)
+    assert 0 <= shard_for('thirdegree', 4) < 4
+
+
+def test_add_watcher(sharded):
+    sharded.add_watcher('thirdegree')
+    shard = shard_for('thirdegree', 2)
+    assert 'thirdegree' in sharded.subreddits[shard]
+    with pytest.raises(RuntimeError):
+        sharded.add_watcher('Thirdegree')
+
+
+def test_add_remove_while_watching(sharded):
+    sharded.watch(pause_after=-1)
+    shard = shard_for('thirdegree', 2)
+    commands = sharded._commands[shard]
+    sharded.add_watcher('thirdegree')
+    sharded.remove_watcher('thirdegree')
+    commands.put.assert_has_calls([call(('add', 'thirdegree')),
+                                   call(('remove', 'thirdegree'))])
+    with pytest.raises(RuntimeError):
+        sharded.remove_watcher('thirdegree')
+
+
+def test_watch_starts_shards(sharded):
+    sharded.add_watcher('thirdegree')
+    sharded.watch(pause_after=-1)
+    assert sharded._ctx.Process.call_count == 2
+    shard = shard_for('thirdegree', 2)
+    for kwargs in (c[1] for c in sharded._ctx.Process.call_args_list):
+        spec = kwargs['args'][0]
+        if 'thirdegree' in spec.subreddits:
+            break
+    else:
+        pytest.fail('thirdegree was not handed to any shard')
+    assert spec.stream_kwargs == {'pause_after': -1}
+    assert all(worker.start.called for worker in sharded._workers)
+
+
+def test_check_workers(sharded):
+    assert sharded.check_workers() == []
+    sharded.watch()
+    dead = sharded._workers[1]
+    dead.is_alive.return_value = False
+    assert sharded.check_workers() == [1]
+    assert sharded._workers[1] is not dead
+    assert sharded.check_workers() == []
+
+
+def test_kill(sharded):
+    sharded.watch()
+    workers = list(sharded._workers)
+    commands = list(sharded._commands)
+    workers[0].is_alive.return_value = False
+    sharded.kill(timeout=0)
+    for command in commands:
+        command.put.assert_called_with(('stop', None))
+    workers[0].terminate.assert_not_called()
+    workers[1].terminate.assert_called()
+    # killed shards are not restarted
+    assert sharded.check_workers() == []
+
+
+@pytest.mark.asyncio
+async def test_get_cancelled_keeps_item(sharded):
+    sharded.results = queue.Queue()
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(sharded.get(), 0.05)
+    # nothing is left waiting on the queue to take this
+    sharded.results.put('t3_abc')
+    await asyncio.sleep(0.05)
+    assert await asyncio.wait_for(sharded.get(), 1) == 't3_abc'
+
+
+def test_remove_watcher():
+    watcher = RedditWatcher(reddit=MagicMock(name='reddit'))
+    subwatcher = MagicMock(name='subwatcher')
+    subwatcher.subreddit.__str__.return_value = 'Thirdegree'
+    watcher.watchers = [subwatcher]
+    watcher.remove_watcher('thirdegree')
+    subwatcher.kill.assert_called()
+    assert watcher.watchers == []
+    with pytest.raises(RuntimeError):
+        watcher.remove_watcher('thirdegree')
@@ -1,9 +1,25 @@
 """
 Collection of tools, scripts, and bots related to moderation and spam killing
 """
-import praw
+from typing import TYPE_CHECKING
+from ._lazy import lazy
+
 # NOTE: logins.praw is a dict with the required info for my personal account.
 #       Replace with arguments before sending out
 
-from . import watchers
-from . import apis
+if TYPE_CHECKING: # pragma: no cover
+    from . import watchers
+    from . import apis
+    from . import detectors
+    from . import tracing
+    from . import sources
+
+# nothing is imported until it's used, so short lived jobs that only need a
+# small piece (url matching, say) don't pay for praw and requests
+lazy(__name__, {
+    'watchers': '.watchers',
+    'apis': '.apis',
+    'detectors': '.detectors',
+    'tracing': '.tracing',
+    'sources': '.sources',
+    })
@@ -0,0 +1,46 @@
+"""
+Lazy attribute loading for packages, so importing the_sentinel (or any
+subpackage) doesn't drag in praw and requests until something actually needs
+them
+"""
+from typing import Any, Dict
+import importlib
+import sys
+import types
+
+
+class LazyModule(types.ModuleType):
+    """
+    Module type that imports its attributes the first time they're looked up.
+    Works the same as a PEP 562 module __getattr__, but also on 3.6
+    """
+    _LAZY: Dict[str, str]
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            target = self.__dict__['_LAZY'][name]
+        except KeyError:
+            raise AttributeError(
+                f"module {self.__name__!r} has no attribute {name!r}") \
+                from None
+        module_name, _, attr = target.partition(':')
+        value = importlib.import_module(module_name, self.__name__)
+        if attr:
+            value = getattr(value, attr)
+        # only pay for the lookup once
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(super().__dir__()) | set(self.__dict__['_LAZY']))
+
+
+def lazy(module_name: str, attrs: Dict[str, str]):
+    """
+    Makes the attributes of module_name load lazily. attrs maps attribute name
+    to 'module' or 'module:attribute', relative to module_name. Call it as
+    lazy(__name__, {...}) from the package's __init__
+    """
+    module = sys.modules[module_name]
+    setattr(module, '_LAZY', attrs)
+    module.__class__ = LazyModule
@@ -0,0 +1,158 @@
+"""
+Deadline budgets for api calls, and the latency tracking hedged requests need
+"""
+from typing import Any, Callable, Deque, Dict, Iterator, Optional, TypeVar
+from collections import deque
+from contextlib import contextmanager
+import functools
+import random
+import threading
+import time
+
+
+class DeadlineExceeded(RuntimeError):
+    """
+    Raised when a call runs out of budget before it gets an answer
+    """
+
+
+class Deadline:
+    """
+    A point in (monotonic) time that a call has to be done by
+    """
+    def __init__(self, seconds: float):
+        self.expires = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """
+        Seconds left, never negative
+        """
+        return max(0.0, self.expires - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        """
+        Whether there's any time left at all
+        """
+        return self.remaining() <= 0
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__}:{self.remaining():.3f}s>"
+
+
+_LOCAL = threading.local()
+
+
+def current_deadline() -> Optional[Deadline]:
+    """
+    The deadline set by the innermost deadline() block on this thread, if any
+    """
+    return getattr(_LOCAL, 'deadline', None)
+
+
+@contextmanager
+def within(budget: Deadline) -> Iterator[Deadline]:
+    """
+    Makes budget the current deadline for the block, unless the one already
+    current is tighter
+    """
+    outer = current_deadline()
+    inner = budget
+    if outer is not None and outer.expires < inner.expires:
+        inner = outer
+    _LOCAL.deadline = inner
+    try:
+        yield inner
+    finally:
+        _LOCAL.deadline = outer
+
+
+def deadline(seconds: float):
+    """
+    Every api call made inside the block (including the ones lazy properties
+    make, like video.channel.json) shares a single budget of `seconds`.
+    Nested blocks can only tighten the budget, never extend it
+    """
+    return within(Deadline(seconds))
+
+
+_T = TypeVar('_T')
+
+
+def carry(func: Callable[..., _T]) -> Callable[..., _T]:
+    """
+    func, wrapped to run under whatever deadline is current here and now.
+    Deadlines are per thread, so anything handed to a pool has to go through
+    this or it gets the default TIMEOUT however little time the caller had
+    """
+    budget = current_deadline()
+    if budget is None:
+        return func
+
+    @functools.wraps(func)
+    def carried(*args: Any, **kwargs: Any) -> _T:
+        with within(budget):
+            return func(*args, **kwargs)
+    return carried
+
+
+def backoff(attempt: int, base: float = 0.1, cap: float = 2) -> float:
+    """
+    Full jitter exponential backoff, seconds to sleep before retry `attempt`
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+
+class LatencyTracker:
+    """
+    Keeps the last `size` request latencies to estimate percentiles from, and
+    counts how hedging is going
+    """
+    def __init__(self, size: int = 1000):
+        self._latencies: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def record_hedge(self, won: bool = False):
+        """
+        Counts a hedged request being sent (won=False) or beating the
+        original (won=True)
+        """
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedged += 1
+
+    def record(self, seconds: float):
+        """
+        Adds a latency sample
+        """
+        with self._lock:
+            self._latencies.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        """
+        Latency at `percent` (0-100) from recent samples, None until there
+        are enough samples to say anything useful
+        """
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if len(latencies) < 20:
+            return None
+        index = min(len(latencies) - 1, int(len(latencies) * percent / 100))
+        return latencies[index]
+
+    def report(self) -> Dict[str, Optional[float]]:
+        """
+        p50/p95/p99 and hedging counts, for logging
+        """
+        return {
+            'p50': self.percentile(50),
+            'p95': self.percentile(95),
+            'p99': self.percentile(99),
+            'samples': len(self._latencies),
+            'hedged': self.hedged,
+            'hedge_wins': self.hedge_wins,
+            }
@@ -1,4 +1,12 @@
 """
 Specifically google apis (primarily youtube, _possibly_ others)
 """
-from . import youtube
+from typing import TYPE_CHECKING
+from ..._lazy import lazy
+
+if TYPE_CHECKING: # pragma: no cover
+    from . import youtube
+
+lazy(__name__, {
+    'youtube': '.youtube',
+    })
@@ -1,9 +1,26 @@
 """
 Youtube related apis
 """
-# FIXME: Fix these cyclic imports in this module
-from .youtube import Youtube
-from .channel import Channel
-from .video import Video
-from .playlist import Playlist
-from .user import User
+from typing import TYPE_CHECKING
+from ...._lazy import lazy
+
+if TYPE_CHECKING: # pragma: no cover
+    from .youtube import Youtube
+    from .channel import Channel
+    from .video import Video
+    from .playlist import Playlist
+    from .user import User
+    from .resolve import resolve_links
+    from .scheduler import LookupScheduler
+    from .uploads import UploadMonitor
+
+lazy(__name__, {
+    'Youtube': '.youtube:Youtube',
+    'Channel': '.channel:Channel',
+    'Video': '.video:Video',
+    'Playlist': '.playlist:Playlist',
+    'User': '.user:User',
+    'resolve_links': '.resolve:resolve_links',
+    'LookupScheduler': '.scheduler:LookupScheduler',
+    'UploadMonitor': '.uploads:UploadMonitor',
+    })
@@ -2,15 +2,16 @@
 Module for youtube channels
 """
 from typing import Optional, Dict, Any
-import re
 from . import youtube
+from . import urls
 
 class Channel(youtube.Youtube):
     """
     Representing things rootied at /channels endpoint
     """
     ENDPOINT_BASE = 'channels'
-    URL_REGEX = re.compile(r'(?i)channel\/(?P<id>.*?)(?:\/|\?|$)')
+    KIND = 'youtube#channel'
+    URL_REGEX = urls.CHANNEL_REGEX
 
     def videos(self,
                query: Optional[str] = None,
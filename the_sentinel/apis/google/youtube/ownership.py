@@ -0,0 +1,128 @@
+"""
+Index of which channel owns what, so video->channel and user->channel lookups
+don't need to go to the network every time
+"""
+from typing import Any, Dict, Iterable, Optional
+import atexit
+import gzip
+import json
+import os
+import threading
+
+
+class OwnershipIndex:
+    """
+    Maps video ids and usernames to the channel id that owns them. The
+    relationship basically never changes, so once we've seen it in any
+    response we never need to ask again.
+
+    Persisted as gzipped json, so it's cheap to keep around between runs.
+    Safe to record into from several threads while it's being saved
+    """
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self.videos: Dict[str, str] = {}
+        self.users: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        if path is not None and os.path.exists(path):
+            self.load(path)
+
+    def video_channel(self, video_id: str) -> Optional[str]:
+        """
+        Channel id for a video id, None if we haven't seen it
+        """
+        return self.videos.get(video_id)
+
+    def user_channel(self, username: str) -> Optional[str]:
+        """
+        Channel id for a username, None if we haven't seen it
+        """
+        # usernames are case insensitive as far as forUsername is concerned
+        return self.users.get(username.lower())
+
+    def add_video(self, video_id: str, channel_id: str):
+        """
+        Records that video_id belongs to channel_id
+        """
+        with self._lock:
+            self.videos[video_id] = channel_id
+
+    def add_user(self, username: str, channel_id: str):
+        """
+        Records that username belongs to channel_id
+        """
+        with self._lock:
+            self.users[username.lower()] = channel_id
+
+    def record(self, items: Iterable[Dict[str, Any]]):
+        """
+        Picks out any ownership information from a list of api items
+        (resp.json()['items']), whatever endpoint they came from
+        """
+        for item in items:
+            kind = item.get('kind')
+            snippet = item.get('snippet', {})
+            if kind == 'youtube#video' and isinstance(item.get('id'), str):
+                video_id = item['id']
+                channel_id = snippet.get('channelId')
+            elif kind == 'youtube#searchResult':
+                video_id = item.get('id', {}).get('videoId')
+                channel_id = snippet.get('channelId')
+            elif kind == 'youtube#playlistItem':
+                # snippet.channelId here is the owner of the *playlist*,
+                # which isn't necessarily who uploaded the video
+                video_id = snippet.get('resourceId', {}).get('videoId')
+                channel_id = snippet.get('videoOwnerChannelId')
+            else:
+                continue
+            if video_id and channel_id:
+                self.add_video(video_id, channel_id)
+
+    def load(self, path: Optional[str] = None):
+        """
+        Merges a saved index into this one
+        """
+        path = path or self.path
+        if path is None:
+            raise RuntimeError("No path to load the ownership index from")
+        with gzip.open(path, 'rt', encoding='utf-8') as infile:
+            data = json.load(infile)
+        with self._lock:
+            self.videos.update(data.get('videos', {}))
+            self.users.update(data.get('users', {}))
+
+    def save(self, path: Optional[str] = None):
+        """
+        Writes the index out. Written to a temp file first so a crash mid-save
+        can't leave a half written index behind
+        """
+        path = path or self.path
+        if path is None:
+            raise RuntimeError("No path to save the ownership index to")
+        # copied so the (slow) dump can't race with threads recording
+        with self._lock:
+            data = {'videos': dict(self.videos), 'users': dict(self.users)}
+        tmp_path = path + '.tmp'
+        with gzip.open(tmp_path, 'wt', encoding='utf-8') as outfile:
+            json.dump(data, outfile, separators=(',', ':'))
+        os.replace(tmp_path, path)
+
+    def persist(self, path: str, at_exit: bool = True):
+        """
+        Backs the index with a file: loads it now if it's there, and saves
+        to it when the process exits if at_exit is set (call save() for
+        anything more often than that)
+        """
+        self.path = path
+        if os.path.exists(path):
+            self.load(path)
+        if at_exit:
+            atexit.register(self.save)
+
+    def __len__(self):
+        return len(self.videos) + len(self.users)
+
+
+# shared by everything in the youtube package. Memory only until something
+# calls OWNERSHIP.persist(path)
+OWNERSHIP = OwnershipIndex()
@@ -2,17 +2,31 @@
 Module for youtube playlists
 """
 from typing import Optional, Dict, Any
-import re
 from . import youtube
+from . import channel
+from . import urls
 
 class Playlist(youtube.Youtube):
     """
     Representing things rootied at /playlists endpoint
     """
     ENDPOINT_BASE = 'playlists'
-    URL_REGEX = re.compile(
-        r'(?<!watch).*?list=(?P<id>(?!videoseries).*?)(?:#|\/|\?|\&|$)'
-        )
+    KIND = 'youtube#playlist'
+    URL_REGEX = urls.PLAYLIST_REGEX
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._channel = None
+
+    @property
+    def channel(self):
+        """
+        Gets the channel object that owns the playlist
+        """
+        if self._channel is None:
+            self._channel = channel.Channel(
+                                id=self.json['snippet']['channelId']
+                                )
+        return self._channel
 
     def videos(self,
                query: Optional[str] = None,
@@ -0,0 +1,189 @@
+"""
+Bulk resolution of youtube links in reddit items down to the channels that own
+them
+"""
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Type, \
+                   TYPE_CHECKING
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+import logging
+import requests
+from ....tracing import TRACER
+from ...deadline import DeadlineExceeded, carry
+from .youtube import Youtube
+from .video import Video
+from .channel import Channel
+from .playlist import Playlist
+from .user import User
+from .ownership import OWNERSHIP
+from . import urls
+if TYPE_CHECKING: # pragma: no cover
+    from ...redirects import RedirectResolver
+
+LOG = logging.getLogger(__name__)
+
+# (Kind, id) for a single link
+Link = Tuple[Type[Youtube], str]
+
+# urls.classify kind names to classes, in urls.URL_KINDS order
+KINDS: Dict[str, Type[Youtube]] = OrderedDict([
+    ('video', Video),
+    ('channel', Channel),
+    ('user', User),
+    ('playlist', Playlist),
+    ])
+
+# attributes of reddit items that might have links in them. Comments have
+# body, submissions have selftext and/or url
+TEXT_ATTRS = ('body', 'selftext', 'url')
+
+
+def item_text(item: Any) -> str:
+    """
+    Gets all the linkable text out of a reddit item (or a plain string)
+    """
+    if isinstance(item, str):
+        return item
+    return ' '.join(str(getattr(item, attr, '') or '') for attr in TEXT_ATTRS)
+
+
+def classify(url: str) -> Optional[Link]:
+    """
+    Works out which kind of youtube object a url points at, without creating
+    the object or making any requests
+    """
+    link = urls.classify(url)
+    if link is None:
+        return None
+    kind, item_id = link
+    return KINDS[kind], item_id
+
+
+def extract_links(text: str) -> List[Link]:
+    """
+    Finds every youtube link in a block of text, deduplicated, in the order
+    they first show up
+    """
+    return [(KINDS[kind], item_id)
+            for kind, item_id in urls.extract_links(text)]
+
+
+def item_links(items: Iterable[Any],
+               redirects: Optional['RedirectResolver'] = None
+              ) -> Dict[Any, List[Link]]:
+    """
+    The links in each item, in order. With a RedirectResolver, shortened
+    links are expanded (each unique one once for the whole batch) and
+    whatever they point at is included too
+    """
+    texts = OrderedDict((item, item_text(item)) for item in items)
+    links: Dict[Any, List[Link]] = OrderedDict(
+        (item, extract_links(text)) for item, text in texts.items())
+    if redirects is None:
+        return links
+    short = OrderedDict((item, redirects.find(text))
+                        for item, text in texts.items())
+    expanded = redirects.expand_many(
+        url for urls_in_item in short.values() for url in urls_in_item)
+    for item, urls_in_item in short.items():
+        for url in urls_in_item:
+            final = expanded.get(url)
+            if final is None:
+                continue
+            # through the youtube host check, a shortener can point anywhere
+            for link in extract_links(final):
+                if link not in links[item]:
+                    links[item].append(link)
+    return links
+
+
+def indexed_owner(link: Link) -> Optional[str]:
+    """
+    The channel id behind link if the ownership index already knows it, so
+    it doesn't need a request
+    """
+    kind, item_id = link
+    if kind is Video:
+        return OWNERSHIP.video_channel(item_id)
+    if kind is User:
+        return OWNERSHIP.user_channel(item_id)
+    return None
+
+
+def fetch_links(links: Iterable[Link],
+                max_workers: int = 4) -> Dict[Link, Youtube]:
+    """
+    Fetches everything links point at, deduplicated and grouped by kind into
+    BATCH_SIZE chunks, with every chunk requested concurrently. Channel links
+    and links the ownership index can answer need no request and aren't
+    fetched.
+
+    A chunk that fails (quota, 5xx after retries, out of time) is logged and
+    left out rather than losing the rest of the batch, as are links to
+    things youtube doesn't know about
+    """
+    wanted: Dict[Type[Youtube], Dict[str, None]] = OrderedDict()
+    for link in links:
+        kind, item_id = link
+        if kind is not Channel and indexed_owner(link) is None:
+            wanted.setdefault(kind, OrderedDict())[item_id] = None
+
+    found: Dict[Link, Youtube] = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # the workers make their requests under this thread's deadline and
+        # traces
+        futures: List[Tuple[Type[Youtube], List[str], Future]] = [
+            (kind, chunk,
+             pool.submit(carry(TRACER.carry(kind.fetch_chunk)), chunk))
+            for kind, ids in wanted.items() for chunk in kind.chunks(ids)]
+        for kind, chunk, future in futures:
+            try:
+                fetched = future.result()
+            except (requests.RequestException, DeadlineExceeded) as exc:
+                LOG.warning("Dropped %d %s ids: %s", len(chunk),
+                            kind.__name__, exc)
+                continue
+            for item_id, obj in fetched.items():
+                found[(kind, item_id)] = obj
+    return found
+
+
+def link_owners(links: Iterable[Link],
+                found: Dict[Link, Youtube]) -> List[Channel]:
+    """
+    The channels behind links, deduplicated, given what fetch_links found
+    """
+    channels: List[Channel] = []
+    for link in links:
+        kind, item_id = link
+        owner_id = item_id if kind is Channel else indexed_owner(link)
+        if owner_id is not None:
+            owner = Channel(id=owner_id)
+        elif link in found:
+            owner = found[link].channel # type: ignore
+        else:
+            continue
+        if owner not in channels:
+            channels.append(owner)
+    return channels
+
+
+def resolve_links(items: Iterable[Any],
+                  max_workers: int = 4,
+                  redirects: Optional['RedirectResolver'] = None
+                 ) -> Dict[Any, List[Channel]]:
+    """
+    Takes a batch of reddit items (anything with body/selftext/url, or plain
+    strings) and maps each one to the channels that own the youtube links in
+    it.
+
+    Links are deduplicated across the whole batch, so a batch only costs one
+    videos.list or playlists.list request per BATCH_SIZE unique ids (plus one
+    per unique username, which can't be batched), all made concurrently. See
+    item_links and fetch_links for the details
+    """
+    links = item_links(items, redirects)
+    found = fetch_links((link for links_in_item in links.values()
+                         for link in links_in_item), max_workers)
+    return OrderedDict((item, link_owners(links_in_item, found))
+                       for item, links_in_item in links.items())
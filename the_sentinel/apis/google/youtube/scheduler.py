@@ -0,0 +1,225 @@
+"""
+Priority scheduling for youtube lookups, so a flood of comment links can't hold
+up checks on new submissions
+"""
+from typing import Any, Callable, Deque, Dict, List, Optional
+from collections import deque
+from concurrent.futures import Future
+import threading
+import time
+from ....tracing import TRACER
+from ...deadline import carry
+from ....sources import item_source, BACKFILL
+
+# highest priority first
+PRIORITIES = ('submission', 'comment', 'backfill')
+DEFAULT_WEIGHTS = {
+    'submission': 8.0,
+    'comment': 2.0,
+    'backfill': 1.0,
+    }
+
+# reddit fullname prefixes
+_FULLNAME_PRIORITIES = {
+    't3_': 'submission',
+    't1_': 'comment',
+    }
+
+
+def lookup_priority(item: Any) -> str:
+    """
+    Priority class for lookups on behalf of a reddit item (the kind of thing
+    SubredditWatcher puts in its queue), or its fullname as a str (what
+    ShardedRedditWatcher gives by default). Anything backfilled is backfill,
+    whatever kind of item it is, and live items that can't be told apart are
+    comments
+    """
+    if item_source(item) == BACKFILL:
+        return BACKFILL
+    if isinstance(item, str):
+        fullname = item
+    else:
+        fullname = str(getattr(item, 'fullname', ''))
+    return _FULLNAME_PRIORITIES.get(fullname[:3], 'comment')
+
+
+class _Job:
+    # pylint: disable=too-few-public-methods
+    __slots__ = ('func', 'args', 'kwargs', 'cost', 'enqueued', 'future')
+
+    def __init__(self, func: Callable[..., Any], args: Any, kwargs: Any,
+                 cost: float):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.cost = cost
+        self.enqueued = time.monotonic()
+        self.future: Future = Future()
+
+
+class _TokenBucket:
+    """
+    Quota units per second, with bursts up to `burst`. A rate of None never
+    blocks
+    """
+    # pylint: disable=too-few-public-methods
+    def __init__(self, rate: Optional[float], burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self, cost: float):
+        """
+        Blocks until `cost` units are available, then uses them
+        """
+        if self.rate is None:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens
+                                   + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= cost:
+                    self._tokens -= cost
+                    return
+                wait = (cost - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class LookupScheduler:
+    """
+    Runs youtube lookups on `workers` threads, ordered by priority class.
+
+    Classes share the workers (and the quota_per_second budget, if one is
+    set) by weighted fair queueing: each class gets service in proportion to
+    its weight, measured in the cost of the jobs it runs. Any job that has
+    waited longer than max_wait seconds goes next regardless, so low
+    priority work still finishes during a flood.
+
+        scheduler.submit_for(submission, resolve_links, [submission])
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self,
+                 weights: Optional[Dict[str, float]] = None,
+                 workers: int = 4,
+                 max_wait: float = 30,
+                 quota_per_second: Optional[float] = None,
+                 quota_burst: float = 100):
+        self.weights = dict(DEFAULT_WEIGHTS)
+        if weights is not None:
+            self.weights.update(weights)
+        self.max_wait = max_wait
+        self._queues: Dict[str, Deque[_Job]]
+        self._queues = {priority: deque() for priority in self.weights}
+        # virtual time each class has been served up to
+        self._served: Dict[str, float] = {priority: 0.0
+                                          for priority in self.weights}
+        # virtual time of the last job dispatched
+        self._clock = 0.0
+        self.dispatched: Dict[str, int] = {priority: 0
+                                           for priority in self.weights}
+        self._quota = _TokenBucket(quota_per_second, quota_burst)
+        self._cond = threading.Condition()
+        self._shutdown = False
+        self._threads: List[threading.Thread] = []
+        for _ in range(workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, func: Callable[..., Any], *args: Any,
+               priority: str = 'comment', cost: float = 1,
+               **kwargs: Any) -> Future:
+        """
+        Schedules func(*args, **kwargs). cost is in quota units (1 for most
+        list calls, 100 for search). It runs under the caller's deadline and
+        traces, if there are any
+        """
+        if priority not in self._queues:
+            raise RuntimeError(f"Unknown priority {priority}")
+        job = _Job(carry(TRACER.carry(func)), args, kwargs, cost)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("Scheduler has been shut down")
+            queue = self._queues[priority]
+            if not queue:
+                # a class coming back from idle starts at the current virtual
+                # time rather than cashing in credit for the time it was idle
+                self._served[priority] = max(self._served[priority],
+                                             self._clock)
+            queue.append(job)
+            self._cond.notify()
+        return job.future
+
+    def submit_for(self, item: Any, func: Callable[..., Any], *args: Any,
+                   cost: float = 1, **kwargs: Any) -> Future:
+        """
+        submit, with the priority worked out from the reddit item the lookup
+        is for
+        """
+        return self.submit(func, *args, priority=lookup_priority(item),
+                           cost=cost, **kwargs)
+
+    def depths(self) -> Dict[str, int]:
+        """
+        Jobs waiting in each class
+        """
+        with self._cond:
+            return {priority: len(queue)
+                    for priority, queue in self._queues.items()}
+
+    def shutdown(self, wait: bool = True):
+        """
+        Stops taking jobs. Jobs already queued still run
+        """
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _next(self) -> Optional[_Job]:
+        """
+        Takes the next job to run. Must hold self._cond
+        """
+        active = [priority for priority, queue in self._queues.items()
+                  if queue]
+        if not active:
+            return None
+        oldest = min(active, key=lambda p: self._queues[p][0].enqueued)
+        if time.monotonic() - self._queues[oldest][0].enqueued > self.max_wait:
+            chosen = oldest
+        else:
+            # whichever class would finish its next job soonest in virtual
+            # time, ties going to the higher weight
+            chosen = min(active, key=lambda p: (
+                self._served[p] + self._queues[p][0].cost / self.weights[p],
+                -self.weights[p]))
+        job = self._queues[chosen].popleft()
+        self._clock = self._served[chosen]
+        self._served[chosen] += job.cost / self.weights[chosen]
+        self.dispatched[chosen] += 1
+        return job
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next()
+                while job is None:
+                    if self._shutdown:
+                        return
+                    self._cond.wait()
+                    job = self._next()
+            self._quota.take(job.cost)
+            if not job.future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = job.func(*job.args, **job.kwargs)
+            except BaseException as exc: # pylint: disable=broad-except
+                job.future.set_exception(exc)
+            else:
+                job.future.set_result(result)
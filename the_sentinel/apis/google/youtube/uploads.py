@@ -0,0 +1,195 @@
+"""
+Cheap polling of channels for new uploads
+"""
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Set
+from collections import OrderedDict, deque
+import asyncio
+import logging
+from .youtube import Youtube
+from .channel import Channel
+from .video import Video
+from .ownership import OWNERSHIP
+
+LOG = logging.getLogger(__name__)
+
+# seconds in a day, for spreading calls_per_day out
+DAY = 24 * 60 * 60
+# the playlist of a channel youtube doesn't know, and the mark of a channel
+# that had no uploads when it was first polled. Sorts before any timestamp
+NONE_FOUND = ''
+
+
+class UploadMonitor:
+    """
+    Watches a set of channels for new uploads through their uploads
+    playlists. Channel.videos() goes through search, which costs 100 quota
+    units a page; a playlistItems page costs 1. Each channel's uploads
+    playlist is looked up once (50 channels per call), after that it's one
+    call per channel per poll.
+
+    Channels are polled round robin, one call every DAY / calls_per_day
+    seconds, so each channel is polled every len(channels) / calls_per_day
+    days: 10k channels at the default 9000 calls a day is roughly once a day
+    each on a 10k unit quota, with room left for the playlist lookups.
+
+    Only videos newer than the newest one already seen for a channel are
+    returned. The first poll of a channel just sets that mark unless
+    emit_existing is set. Channels youtube doesn't know are remembered and
+    not looked up again until they're removed and added back
+    """
+    def __init__(self,
+                 channels: Iterable[str] = (),
+                 calls_per_day: int = 9000,
+                 emit_existing: bool = False):
+        self.calls_per_day = calls_per_day
+        self.emit_existing = emit_existing
+        # channel id -> uploads playlist id, None until looked up and
+        # NONE_FOUND if there isn't one
+        self._playlists: Dict[str, Optional[str]] = OrderedDict()
+        # channel id -> newest publishedAt seen (None before the first poll,
+        # NONE_FOUND if it found nothing), and the video ids published at
+        # exactly that time
+        self._marks: Dict[str, Optional[str]] = {}
+        self._at_mark: Dict[str, Set[str]] = {}
+        self._rotation: Deque[str] = deque()
+        for channel_id in channels:
+            self.add(channel_id)
+
+    @property
+    def interval(self) -> float:
+        """
+        Seconds between polls
+        """
+        return DAY / self.calls_per_day
+
+    def add(self, channel_id: str):
+        """
+        Starts watching a channel
+        """
+        if channel_id in self._playlists:
+            return
+        self._playlists[channel_id] = None
+        self._marks[channel_id] = None
+        self._at_mark[channel_id] = set()
+        self._rotation.append(channel_id)
+
+    def remove(self, channel_id: str):
+        """
+        Stops watching a channel
+        """
+        del self._playlists[channel_id]
+        del self._marks[channel_id]
+        del self._at_mark[channel_id]
+        self._rotation.remove(channel_id)
+
+    def __len__(self):
+        return len(self._playlists)
+
+    def resolve_playlists(self):
+        """
+        Looks up the uploads playlist of every channel that doesn't have one
+        yet, Youtube.BATCH_SIZE channels per call
+        """
+        missing = [channel_id for channel_id, playlist
+                   in self._playlists.items() if playlist is None]
+        session = Channel()
+        for start in range(0, len(missing), Youtube.BATCH_SIZE):
+            chunk = missing[start:start + Youtube.BATCH_SIZE]
+            resp = session.get('', params={'id': ','.join(chunk),
+                                           'part': 'contentDetails',
+                                           'maxResults': len(chunk)})
+            resp.raise_for_status()
+            for item in resp.json().get('items', []):
+                if item['id'] in self._playlists:
+                    self._playlists[item['id']] = \
+                        item['contentDetails']['relatedPlaylists']['uploads']
+            for channel_id in chunk:
+                # deleted, terminated, ...
+                if channel_id in self._playlists \
+                        and self._playlists[channel_id] is None:
+                    self._playlists[channel_id] = NONE_FOUND
+
+    def poll(self, channel_id: str) -> List[Video]:
+        """
+        Gets any uploads from channel_id newer than the last poll, newest
+        first
+        """
+        if self._playlists[channel_id] is None:
+            self.resolve_playlists()
+        playlist = self._playlists[channel_id]
+        if not playlist:
+            return []
+        params: Dict[str, Any] = {'playlistId': playlist, 'maxResults': 50}
+        resp = Youtube().get('playlistItems', params=params)
+        resp.raise_for_status()
+
+        mark = self._marks[channel_id]
+        at_mark = self._at_mark[channel_id]
+        new = []
+        for item in resp.json().get('items', []):
+            snippet = item['snippet']
+            video_id = snippet['resourceId']['videoId']
+            published = snippet['publishedAt']
+            # the api's timestamps are all the same ISO 8601 format, so they
+            # sort as strings
+            if mark is not None and (published < mark or (
+                    published == mark and video_id in at_mark)):
+                continue
+            new.append((published, video_id))
+            OWNERSHIP.add_video(video_id, channel_id)
+
+        if new:
+            newest = max(published for published, _ in new)
+            if mark is None or newest > mark:
+                self._marks[channel_id] = newest
+                self._at_mark[channel_id] = set()
+            self._at_mark[channel_id].update(
+                video_id for published, video_id in new if published == newest)
+        elif mark is None:
+            # so the first upload is new next time, not taken as the mark
+            self._marks[channel_id] = NONE_FOUND
+        if mark is None and not self.emit_existing:
+            return []
+        new.sort(reverse=True)
+        return [Video(id=video_id) for _, video_id in new]
+
+    def _next_channel(self) -> Optional[str]:
+        if not self._rotation:
+            return None
+        channel_id = self._rotation[0]
+        self._rotation.rotate(-1)
+        return channel_id
+
+    def poll_next(self) -> List[Video]:
+        """
+        Polls the next channel in the rotation
+        """
+        channel_id = self._next_channel()
+        if channel_id is None:
+            return []
+        return self.poll(channel_id)
+
+    async def watch(self, callback: Callable[[Video], Any]):
+        """
+        Polls forever at the configured rate, calling callback with each new
+        video. A channel that fails to poll is logged and skipped until its
+        next turn
+        """
+        # pylint: disable=try-except-raise
+        loop = asyncio.get_event_loop()
+        while True:
+            channel_id = self._next_channel()
+            videos: List[Video] = []
+            if channel_id is not None:
+                try:
+                    videos = await loop.run_in_executor(
+                        None, self.poll, channel_id)
+                except asyncio.CancelledError:
+                    # an Exception itself before 3.8, so it has to be let
+                    # through before the catch all
+                    raise
+                except Exception: # pylint: disable=broad-except
+                    LOG.exception("Polling channel %s failed", channel_id)
+            for video in videos:
+                callback(video)
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,58 @@
+"""
+Youtube url matching. Has no dependencies beyond re, so anything that only
+needs to recognise links can import it without paying for requests
+"""
+from typing import List, Optional, Pattern, Tuple
+import re
+
+# (kind, id) for a single link, kind being one of the URL_KINDS names
+UrlLink = Tuple[str, str]
+
+# special charecters found
+# https://secure.n-able.com/webhelp/NC_9-1-0_SO_en/Content/SA_docs/API_Level_Integration/API_Integration_URLEncoding.html
+VIDEO_REGEX = re.compile(
+    (r'(?:youtu\.be\/|watch\?v=|\/embed\/)(?P<id>.*?)'
+     r'(?:[$&+,/:;=?@]|$)')
+    )
+CHANNEL_REGEX = re.compile(r'(?i)channel\/(?P<id>.*?)(?:\/|\?|$)')
+USER_REGEX = re.compile(r'user\/(?P<id>.*)(?:\?|$|\/)')
+PLAYLIST_REGEX = re.compile(
+    r'(?<!watch).*?list=(?P<id>(?!videoseries).*?)(?:#|\/|\?|\&|$)'
+    )
+
+LINK_REGEX = re.compile(
+    r'(?i)(?:https?:\/\/)?(?:[\w-]+\.)*(?:youtube\.com|youtu\.be|'
+    r'youtube-nocookie\.com)\/[^\s\)\]\[<>"\']+'
+    )
+
+# order matters, watch?v=...&list=... is a video first and a playlist second
+URL_KINDS: List[Tuple[str, Pattern]] = [
+    ('video', VIDEO_REGEX),
+    ('channel', CHANNEL_REGEX),
+    ('user', USER_REGEX),
+    ('playlist', PLAYLIST_REGEX),
+    ]
+
+
+def classify(url: str) -> Optional[UrlLink]:
+    """
+    Works out which kind of youtube object a url points at
+    """
+    for kind, regex in URL_KINDS:
+        match = regex.search(url)
+        if match and match.group('id'):
+            return kind, match.group('id')
+    return None
+
+
+def extract_links(text: str) -> List[UrlLink]:
+    """
+    Finds every youtube link in a block of text, deduplicated, in the order
+    they first show up
+    """
+    links: List[UrlLink] = []
+    for url in LINK_REGEX.findall(text):
+        link = classify(url)
+        if link is not None and link not in links:
+            links.append(link)
+    return links
@@ -1,9 +1,11 @@
 """
 Module for youtube users (basically aliases of channels, kind of)
 """
-import re
+from typing import Dict, List, Mapping
 import requests
-from . import Channel
+from .channel import Channel
+from . import urls
+from .ownership import OWNERSHIP
 
 # User is essentially an alias for channels, except the ids don't match as
 # nicely so it's a bit of a pain
@@ -11,7 +13,10 @@ class User(Channel):
     """
     Class for youtube Users
     """
-    URL_REGEX = re.compile(r'user\/(?P<id>.*)(?:\?|$|\/)')
+    URL_REGEX = urls.USER_REGEX
+    # forUsername can't be batched
+    BATCH_SIZE = 1
+
     @property
     def resp(self) -> requests.Response:
         if self._resp is None:
@@ -20,8 +25,46 @@ class User(Channel):
         return self._resp
 
     @property
-    def json(self): # pragma: no cover
-        # too simple to do test coverage
+    def json(self):
         if self._json is None:
-            self._json = next(iter(self.resp.json()['items']))
+            channel_id = OWNERSHIP.user_channel(self.id)
+            if channel_id is not None:
+                # goes through the normal (cached, batchable) channel lookup
+                # instead of forUsername
+                self._json = Channel(id=channel_id).json
+            else:
+                self._json = next(iter(self.resp.json()['items']))
+                OWNERSHIP.add_user(self.id, self._json['id'])
         return self._json
+
+    @property
+    def channel(self) -> Channel:
+        """
+        Gets the real (channel id keyed) channel object for this user
+        """
+        channel_id = OWNERSHIP.user_channel(self.id)
+        if channel_id is None:
+            channel_id = self.json['id']
+        return Channel(id=channel_id)
+
+    @classmethod
+    def fetch_chunk(cls, ids: List[str]) -> Mapping[str, 'User']:
+        """
+        forUsername only takes a single name, so this is one request per
+        name (BATCH_SIZE is 1 to match), except for names the ownership index
+        already knows, which cost nothing. Names youtube doesn't know about
+        are left out
+        """
+        found: Dict[str, User] = {}
+        for name in ids:
+            user = cls(id=name)
+            if OWNERSHIP.user_channel(name) is not None:
+                # .channel is answered from the index, don't fetch .json
+                found[name] = user
+                continue
+            try:
+                user.json # pylint: disable=pointless-statement
+            except (StopIteration, KeyError):
+                continue
+            found[name] = user
+        return found
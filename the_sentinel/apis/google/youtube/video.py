@@ -1,21 +1,18 @@
 """
 Module for youtube videos
 """
-import re
 from . import youtube
 from . import channel
+from . import urls
+from .ownership import OWNERSHIP
 
 class Video(youtube.Youtube):
     """
     Representing things rootied at /videos endpoint
     """
     ENDPOINT_BASE = 'videos'
-    # special charecters found
-    # https://secure.n-able.com/webhelp/NC_9-1-0_SO_en/Content/SA_docs/API_Level_Integration/API_Integration_URLEncoding.html
-    URL_REGEX = re.compile(
-        (r'(?:youtu\.be\/|watch\?v=|\/embed\/)(?P<id>.*?)'
-         r'(?:[$&+,/:;=?@]|$)')
-        )
+    KIND = 'youtube#video'
+    URL_REGEX = urls.VIDEO_REGEX
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._channel = None
@@ -26,7 +23,9 @@ class Video(youtube.Youtube):
         Gets a channel object for the video
         """
         if self._channel is None:
-            self._channel = channel.Channel(
-                                id=self.json['snippet']['channelId']
-                                )
+            channel_id = OWNERSHIP.video_channel(self.id)
+            if channel_id is None:
+                channel_id = self.json['snippet']['channelId']
+                OWNERSHIP.add_video(self.id, channel_id)
+            self._channel = channel.Channel(id=channel_id)
         return self._channel
@@ -1,9 +1,36 @@
 """
 Base module for youtube related things
 """
-from typing import Dict, Any, Optional, cast, Type, Tuple, Callable
+from typing import Dict, Any, Optional, cast, Type, Tuple, Callable, \
+                   Iterable, List, Mapping
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import functools
+import importlib
+import threading
+import time
 import requests
-from ... import RestBase
+from ...base import RestBase
+from ....tracing import TRACER
+from ...deadline import Deadline, DeadlineExceeded, LatencyTracker, \
+                         current_deadline, backoff
+from .ownership import OWNERSHIP
+
+# threads for hedged requests, shared by every Youtube object
+_HEDGE_POOL = ThreadPoolExecutor(max_workers=16)
+_HEDGE_LOCAL = threading.local()
+
+
+def _hedge_request(method: str, url: str,
+                   **kwargs: Any) -> requests.Response:
+    """
+    The duplicate attempt of a hedged request, made with the hedge thread's
+    own session rather than one the original attempt is still using
+    """
+    session = getattr(_HEDGE_LOCAL, 'session', None)
+    if session is None:
+        session = _HEDGE_LOCAL.session = requests.Session()
+    return RestBase.request(session, method, url, **kwargs)
 
 
 class Youtube(RestBase):
@@ -17,6 +44,31 @@ class Youtube(RestBase):
     AUTH: Dict[str, str]
     AUTH = {}
 
+    # the most ids any of the list endpoints will take in a single request
+    BATCH_SIZE = 50
+
+    # seconds a call gets when it isn't made inside a deadline() block
+    TIMEOUT = 10.0
+    # extra attempts on connection errors and these statuses, only made if
+    # they fit in what's left of the budget
+    RETRIES = 2
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+    # send a duplicate GET if the first hasn't answered within the p95
+    # latency, and use whichever answers first
+    HEDGE = False
+    LATENCY = LatencyTracker()
+
+    # resp.json()['items'][i]['kind'] of this type, subclasses that set it are
+    # registered in KINDS
+    KIND = ''
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # only classes that set KIND themselves, User shouldn't replace
+        # Channel just by inheriting from it
+        if 'KIND' in cls.__dict__ and cls.KIND:
+            KINDS[cls.KIND] = cls
+
     @property
     def resp(self) -> requests.Response:
         """
@@ -39,11 +91,21 @@ class Youtube(RestBase):
             self._json = next(
                 filter(
                     lambda x: self._getid(x) == self.id,
-                    self.resp.json()['items']
+                    self._items(self.resp)
                     )
                 )
         return self._json
 
+    @staticmethod
+    def _items(resp: requests.Response) -> List[Dict[str, Any]]:
+        """
+        Gets the items out of a response, recording any channel ownership
+        they tell us about on the way past
+        """
+        items = cast(List[Dict[str, Any]], resp.json().get('items', []))
+        OWNERSHIP.record(items)
+        return items
+
     @staticmethod
     def _getid(item: Dict[str, Any]) -> str:
         try:
@@ -58,16 +120,142 @@ class Youtube(RestBase):
         url = self.format_url(url)
         if params is None:
             params = {}
+        # snippet unless the caller wants a different part
+        params.setdefault('part', 'snippet')
         params.update({
-            'part': 'snippet',
             'key': self.AUTH.get('key', '')
             })
-        resp = super().request(method, url, params=params, **kwargs)
+        budget = current_deadline()
+        timeout = kwargs.pop('timeout', None)
+        if budget is None or (timeout is not None
+                              and timeout < budget.remaining()):
+            budget = Deadline(self.TIMEOUT if timeout is None else timeout)
+
+        attempt = 0
+        while True:
+            if budget.expired:
+                raise DeadlineExceeded(f"No time left for {method} {url}")
+            try:
+                with TRACER.span(f'youtube {method} {url}'):
+                    resp = self._send(method, url, params, budget, kwargs)
+            except (requests.ConnectionError, requests.Timeout) as exc:
+                if not self._retry(attempt, budget):
+                    if isinstance(exc, requests.Timeout) or budget.expired:
+                        raise DeadlineExceeded(
+                            f"Ran out of time for {method} {url}") from exc
+                    raise
+                attempt += 1
+                continue
+            if resp.status_code not in self.RETRY_STATUSES \
+                    or not self._retry(attempt, budget):
+                break
+            attempt += 1
+
         if resp.status_code == 400:
             raise RuntimeError("Authentication issue with Youtube api")
 
         return resp
 
+    def _retry(self, attempt: int, budget: Deadline) -> bool:
+        """
+        Sleeps before the next attempt if there should be one
+        """
+        delay = backoff(attempt)
+        if attempt >= self.RETRIES or delay >= budget.remaining():
+            return False
+        time.sleep(delay)
+        return True
+
+    def _timed(self, send: Callable[..., requests.Response],
+               budget: Deadline) -> requests.Response:
+        start = time.monotonic()
+        resp = send(timeout=max(budget.remaining(), 0.001))
+        self.LATENCY.record(time.monotonic() - start)
+        return resp
+
+    def _send(self, method: str, url: str, params: Dict[str, Any],
+              budget: Deadline, kwargs: Dict[str, Any]) -> requests.Response:
+        """
+        A single attempt, hedged if that's turned on and it's worth it
+        """
+        send = functools.partial(super().request, method, url,
+                                 params=params, **kwargs)
+        hedge_after = None
+        if self.HEDGE and method.upper() == 'GET':
+            hedge_after = self.LATENCY.percentile(95)
+        if hedge_after is None or hedge_after >= budget.remaining():
+            return self._timed(send, budget)
+
+        first = _HEDGE_POOL.submit(self._timed, send, budget)
+        done, _ = wait([first], timeout=hedge_after)
+        if done:
+            return first.result()
+        self.LATENCY.record_hedge()
+        hedge = functools.partial(_hedge_request, method, url,
+                                  params=params, **kwargs)
+        second = _HEDGE_POOL.submit(self._timed, hedge, budget)
+        pending = {first, second}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, timeout=budget.remaining(),
+                                 return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    if future is second:
+                        self.LATENCY.record_hedge(won=True)
+                    return future.result()
+                error = future.exception()
+        if error is not None:
+            raise error
+        raise DeadlineExceeded(f"Ran out of time for {method} {url}")
+
+    @classmethod
+    def chunks(cls, ids: Iterable[str]) -> List[List[str]]:
+        """
+        ids deduplicated and cut into lists of at most BATCH_SIZE, one per
+        fetch_chunk request
+        """
+        unique = list(OrderedDict.fromkeys(ids))
+        return [unique[start:start + cls.BATCH_SIZE]
+                for start in range(0, len(unique), cls.BATCH_SIZE)]
+
+    @classmethod
+    def fetch_chunk(cls, ids: List[str]) -> Mapping[str, 'Youtube']:
+        """
+        Fetches up to BATCH_SIZE objects of this kind in a single list
+        request. Returned objects have their json already filled in.
+
+        Ids youtube doesn't know about (deleted, private, ...) are left out of
+        the returned dict
+        """
+        found: Dict[str, Youtube] = {}
+        if not ids:
+            return found
+        # any instance will do to make the request, the id isn't used
+        params: Dict[str, Any] = {'id': ','.join(ids), 'maxResults': len(ids)}
+        resp = cls().get('', params=params)
+        resp.raise_for_status()
+        for item in cls._items(resp):
+            item_id = cls._getid(item)
+            instance = cls(id=item_id)
+            instance._resp = resp # pylint: disable=protected-access
+            instance._json = item # pylint: disable=protected-access
+            found[item_id] = instance
+        return found
+
+    @classmethod
+    def fetch_many(cls, ids: Iterable[str]) -> Mapping[str, 'Youtube']:
+        """
+        fetch_chunk for any number of ids, a chunk at a time. resolve_links
+        makes the chunk requests concurrently instead
+        """
+        found: Dict[str, Youtube] = {}
+        for chunk in cls.chunks(ids):
+            found.update(cls.fetch_chunk(chunk))
+        return found
+
     def search(self, query='', endpoint='', params=None,
                limit: Optional[int] = None, **kwargs):
         """
@@ -82,10 +270,9 @@ class Youtube(RestBase):
             })
         resp = self.get(url=endpoint, params=params, **kwargs)
         ret = []
-        for item in resp.json()['items']:
+        for item in self._items(resp):
             item_id, kind = KIND_MAPPING[item['kind']](item)
-            item = kind(id=item_id, resp=resp)
-            ret.append(item)
+            ret.append(kind(id=item_id, resp=resp))
         return ret
 
     @property
@@ -97,12 +284,27 @@ class Youtube(RestBase):
         return self.json['snippet']['title']
 
 
-# these need to be at the bottom or neither can import the other
-# pylint: disable=wrong-import-position
-from . import video
-from . import channel
-from . import playlist
-# pylint: enable=wrong-import-position
+# registry of Youtube subclasses by KIND, filled in as the subclasses are
+# defined. Looked up at call time instead of importing the subclasses here,
+# which would be a cyclic import
+KINDS: Dict[str, Type[Youtube]] = {}
+
+# where to find the class for each kind if it hasn't been imported yet
+KIND_MODULES = {
+    'youtube#video': '.video',
+    'youtube#channel': '.channel',
+    'youtube#playlist': '.playlist',
+    }
+
+
+def kind_class(kind: str) -> Type[Youtube]:
+    """
+    Gets the registered class for a kind, importing it if needed
+    """
+    if kind not in KINDS:
+        importlib.import_module(KIND_MODULES[kind], __package__)
+    return KINDS[kind]
+
 
 KIND_MAPPING: Dict[str, Callable[[Dict[str, Any]], Tuple[str, Type[Youtube]]]]
 KIND_MAPPING = {
@@ -110,16 +312,16 @@ KIND_MAPPING = {
     # functions should expect resp.json()['items'][i] and return
     # (id, Kind)
     'youtube#video': lambda item: (item['id']['videoId'],
-                                   video.Video),
+                                   kind_class('youtube#video')),
     'youtube#channel': lambda item: (item['id']['channelId'],
-                                     channel.Channel),
+                                     kind_class('youtube#channel')),
     'youtube#playlist': lambda item: (item['id']['playlistId'],
-                                      playlist.Playlist),
+                                      kind_class('youtube#playlist')),
     # pylint: disable=unnecessary-lambda
     'youtube#searchResult': lambda item:\
                                 KIND_MAPPING[item['id']['kind']](item),
     'youtube#playlistItem': lambda item: (item['snippet']\
                                               ['resourceId']['videoId'],
-                                          video.Video),
+                                          kind_class('youtube#video')),
 
     }
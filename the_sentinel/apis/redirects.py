@@ -0,0 +1,204 @@
+"""
+Expanding shortened links, so a youtube link behind bit.ly still gets looked
+at
+"""
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+import re
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from lru import LRU # pylint: disable=no-name-in-module
+
+# hosts that are only ever redirects, and so worth a request to expand
+SHORTENERS: FrozenSet[str] = frozenset({
+    'bit.ly', 'bitly.com', 'goo.gl', 'tinyurl.com', 't.co', 'ow.ly',
+    'is.gd', 'buff.ly', 'rebrand.ly', 'cutt.ly', 'shorturl.at', 'tiny.cc',
+    'rb.gy', 'v.gd', 'lnkd.in', 'bl.ink', 'soo.gd', 'shorte.st', 'adf.ly',
+    })
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+# a host and the start of a path, what a link written without a scheme
+# (bit.ly/xyz) has to look like to be taken as one
+_BARE_LINK = (r'(?:(?:[a-z0-9-]+\.)+[a-z]{2,}|\d{1,3}(?:\.\d{1,3}){3})'
+              r'(?::\d+)?\/')
+URL_REGEX = re.compile(r'(?i)(?:https?:\/\/|(?<![\w@.\/-])(?=' + _BARE_LINK
+                       + r'))[^\s\)\]\[<>"\']+')
+
+
+def _host(url: str) -> str:
+    host = (urlsplit(url).hostname or '').lower()
+    return host[4:] if host.startswith('www.') else host
+
+
+class RedirectResolver:
+    """
+    Follows redirects from shortener links (hosts in `domains`, any host at
+    all if that's None) to where they end up.
+
+    Chains are followed a hop at a time with HEAD requests (GET if the
+    shortener refuses HEAD), stopping at the first url that isn't itself a
+    shortener, so the final site is never actually requested. Results go in
+    an LRU of max_size urls for ttl seconds, failures for negative_ttl, and
+    a url being expanded by one thread is waited on rather than requested
+    again by the others. At most per_domain requests go to any one host at
+    once
+    """
+    # pylint: disable=too-many-instance-attributes
+    # links written without one (bit.ly/xyz) are requested over this
+    SCHEME = 'https'
+
+    def __init__(self,
+                 domains: Optional[Iterable[str]] = SHORTENERS,
+                 max_size: int = 10000,
+                 ttl: float = 24 * 60 * 60,
+                 negative_ttl: float = 10 * 60,
+                 per_domain: int = 4,
+                 max_workers: int = 16,
+                 timeout: float = 5,
+                 max_redirects: int = 10):
+        # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self.domains = None if domains is None else frozenset(domains)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.per_domain = per_domain
+        self.timeout = timeout
+        self.max_redirects = max_redirects
+        # url -> (final url or None, expiry in time.monotonic)
+        self._cache: 'LRU[str, Tuple[Optional[str], float]]'
+        self._cache = LRU(max_size)
+        self._inflight: Dict[str, 'Future[Optional[str]]'] = {}
+        self._limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=max_workers,
+                              pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.requests = 0
+
+    def should_expand(self, url: str) -> bool:
+        """
+        Whether url is on a host we'd follow redirects for
+        """
+        return self.domains is None or _host(url) in self.domains
+
+    def find(self, text: str) -> List[str]:
+        """
+        Every expandable url in a block of text, deduplicated. Links written
+        without a scheme come back with SCHEME added
+        """
+        found: List[str] = []
+        for url in URL_REGEX.findall(text):
+            if '://' not in url:
+                url = f'{self.SCHEME}://{url}'
+            if self.should_expand(url) and url not in found:
+                found.append(url)
+        return found
+
+    def cached(self, url: str) -> Tuple[bool, Optional[str]]:
+        """
+        (hit, final url) from the cache alone
+        """
+        entry = self._cache.get(url)
+        if entry is None or entry[1] < time.monotonic():
+            return False, None
+        return True, entry[0]
+
+    def expand(self, url: str) -> Optional[str]:
+        """
+        Where url ends up, None if it couldn't be followed. Urls that aren't
+        on a shortener come straight back
+        """
+        if not self.should_expand(url):
+            return url
+        hit, final = self.cached(url)
+        if hit:
+            return final
+        with self._lock:
+            waiting = self._inflight.get(url)
+            if waiting is None:
+                mine: 'Future[Optional[str]]' = Future()
+                self._inflight[url] = mine
+        if waiting is not None:
+            return waiting.result()
+        try:
+            final = self._follow(url)
+            ttl = self.ttl if final is not None else self.negative_ttl
+            self._cache[url] = (final, time.monotonic() + ttl)
+            mine.set_result(final)
+        except BaseException as exc:
+            mine.set_exception(exc)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[url]
+        return final
+
+    def expand_many(self, urls: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        expand for a batch of urls, with the ones that need requests made
+        concurrently
+        """
+        results: Dict[str, Optional[str]] = {}
+        futures = {}
+        for url in urls:
+            if url in results or url in futures:
+                continue
+            hit, final = self.cached(url)
+            if hit or not self.should_expand(url):
+                results[url] = final if hit else url
+            else:
+                futures[url] = self._pool.submit(self.expand, url)
+        for url, future in futures.items():
+            results[url] = future.result()
+        return results
+
+    def _limit(self, host: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if host not in self._limits:
+                self._limits[host] = threading.BoundedSemaphore(
+                    self.per_domain)
+            return self._limits[host]
+
+    def _hop(self, url: str) -> Optional[str]:
+        """
+        Where url redirects to, None if it doesn't
+        """
+        with self._limit(_host(url)):
+            with self._lock:
+                self.requests += 1
+            resp = self.session.head(url, allow_redirects=False,
+                                     timeout=self.timeout)
+            if resp.status_code in (403, 405, 501):
+                # some shorteners only talk to GET, don't read the body
+                resp = self.session.get(url, allow_redirects=False,
+                                        timeout=self.timeout, stream=True)
+                resp.close()
+        if resp.status_code in REDIRECT_STATUSES \
+                and 'location' in resp.headers:
+            return urljoin(url, resp.headers['location'])
+        return None
+
+    def _follow(self, url: str) -> Optional[str]:
+        current = url
+        for _ in range(self.max_redirects):
+            try:
+                location = self._hop(current)
+            except requests.RequestException:
+                return None
+            if location is None:
+                return current
+            if not self.should_expand(location):
+                return location
+            current = location
+        return None
+
+    def close(self):
+        """
+        Stops the worker threads and closes pooled connections
+        """
+        self._pool.shutdown()
+        self.session.close()
@@ -0,0 +1,14 @@
+"""
+Things that look at the stream of resolved links and decide what's spam
+"""
+from typing import TYPE_CHECKING
+from .._lazy import lazy
+
+if TYPE_CHECKING: # pragma: no cover
+    from .burst import BurstDetector, BurstSettings, Burst
+
+lazy(__name__, {
+    'BurstDetector': '.burst:BurstDetector',
+    'BurstSettings': '.burst:BurstSettings',
+    'Burst': '.burst:Burst',
+    })
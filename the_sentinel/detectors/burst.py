@@ -0,0 +1,119 @@
+"""
+Notices a youtube channel suddenly being linked from lots of places at once,
+which is what spam rings look like from the outside
+"""
+from typing import Any, Callable, Iterable, NamedTuple, Optional, Tuple
+import time
+from lru import LRU # pylint: disable=no-name-in-module
+from .sketch import SlidingCountMin, SlidingHyperLogLog
+
+
+class Burst(NamedTuple):
+    """
+    What a channel looked like in the window when it crossed the thresholds
+    """
+    channel_id: str
+    links: int
+    subreddits: float
+    authors: float
+
+
+class BurstSettings(NamedTuple):
+    """
+    Thresholds and sketch sizes for a BurstDetector. A channel bursts when it
+    has at least min_links links from at least min_subreddits subreddits and
+    min_authors authors within window seconds, and fires at most once per
+    cooldown seconds (window if None).
+
+    max_tracked is how many recently seen channels get distinct counts kept,
+    width and depth size the count-min sketch and precision the
+    HyperLogLogs. buckets is how finely the window slides
+    """
+    window: float = 600
+    buckets: int = 10
+    min_links: int = 10
+    min_subreddits: int = 3
+    min_authors: int = 3
+    max_tracked: int = 5000
+    cooldown: Optional[float] = None
+    width: int = 4096
+    depth: int = 4
+    precision: int = 6
+
+
+class BurstDetector:
+    """
+    Streaming aggregation of (channel, subreddit, author) link sightings over
+    a sliding window. callback(Burst) fires when a channel crosses the
+    thresholds in settings (BurstSettings() if not given).
+
+    Link counts come from a count-min sketch over every channel. Distinct
+    subreddits and authors come from small HyperLogLogs kept for the
+    max_tracked most recently seen channels. Memory is fixed by the settings
+    no matter how much goes through, and each observation costs the same
+    """
+    def __init__(self,
+                 callback: Callable[[Burst], Any],
+                 settings: Optional[BurstSettings] = None):
+        if settings is None:
+            settings = BurstSettings()
+        self.callback = callback
+        self.settings = settings
+        self.cooldown = settings.window if settings.cooldown is None \
+            else settings.cooldown
+        self._links = SlidingCountMin(settings.window, settings.buckets,
+                                      settings.width, settings.depth)
+        # channel id -> (subreddits, authors) sketches
+        self._tracked: 'LRU[str, Tuple[SlidingHyperLogLog, ...]]'
+        self._tracked = LRU(settings.max_tracked)
+        # channel id -> when it last fired
+        self._fired: 'LRU[str, float]' = LRU(settings.max_tracked)
+
+    def _sketch(self) -> SlidingHyperLogLog:
+        return SlidingHyperLogLog(self.settings.window, self.settings.buckets,
+                                  self.settings.precision)
+
+    def observe(self, channel_id: str, subreddit: str, author: str,
+                now: Optional[float] = None) -> Optional[Burst]:
+        """
+        Records one link to channel_id, from author in subreddit. Returns the
+        Burst if this tipped the channel over the thresholds
+        """
+        if now is None:
+            now = time.time()
+        self._links.add(channel_id, now)
+        if channel_id not in self._tracked:
+            self._tracked[channel_id] = (self._sketch(), self._sketch())
+        subreddits, authors = self._tracked[channel_id]
+        subreddits.add(subreddit.lower(), now)
+        authors.add(author.lower(), now)
+
+        # cheapest check first, almost everything stops here
+        links = self._links.estimate(channel_id, now)
+        if links < self.settings.min_links:
+            return None
+        last = self._fired.get(channel_id)
+        if last is not None and now - last < self.cooldown:
+            return None
+        burst = Burst(channel_id, links, subreddits.count(now),
+                      authors.count(now))
+        if burst.subreddits < self.settings.min_subreddits \
+                or burst.authors < self.settings.min_authors:
+            return None
+        self._fired[channel_id] = now
+        self.callback(burst)
+        return burst
+
+    def observe_item(self, item: Any,
+                     channels: Iterable[Any]) -> Tuple[Burst, ...]:
+        """
+        Records every channel a reddit item linked to (as resolve_links gives
+        them). Uses the item's own timestamp, so replayed history bursts the
+        same way it did live
+        """
+        subreddit = str(getattr(item, 'subreddit', ''))
+        author = str(getattr(item, 'author', ''))
+        now = getattr(item, 'created_utc', None)
+        bursts = (self.observe(channel.id, subreddit, author, now)
+                  for channel in channels)
+        return tuple(burst for burst in bursts if burst is not None)
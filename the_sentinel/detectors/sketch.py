@@ -0,0 +1,145 @@
+"""
+Fixed size sliding window sketches: count-min for counts and HyperLogLog for
+distinct counts. Memory is set at construction and never grows, whatever goes
+through them
+"""
+from typing import List, Tuple
+from array import array
+from hashlib import blake2b
+from math import log
+
+
+def _hashes(value: str) -> Tuple[int, int]:
+    """
+    Two independent 64 bit hashes of value. Stable across processes, unlike
+    hash()
+    """
+    digest = blake2b(value.encode('utf-8'), digest_size=16).digest()
+    return (int.from_bytes(digest[:8], 'little'),
+            int.from_bytes(digest[8:], 'little'))
+
+
+class _Ring:
+    """
+    The bucket bookkeeping both sketches share. The window is split into
+    `buckets` slots of window / buckets seconds, each remembering which bucket
+    number it currently holds so stale ones can be skipped or reused
+    """
+    def __init__(self, window: float, buckets: int):
+        self.buckets = buckets
+        self.width = window / buckets
+        self._epochs: List[int] = [-1] * buckets
+
+    def slot_for(self, now: float) -> Tuple[int, bool]:
+        """
+        (slot, fresh) for a timestamp. slot is -1 if now is too old to fit in
+        the window. fresh means the slot was holding an old bucket and has to
+        be cleared before use
+        """
+        epoch = int(now // self.width)
+        slot = epoch % self.buckets
+        if self._epochs[slot] == epoch:
+            return slot, False
+        if self._epochs[slot] > epoch:
+            return -1, False
+        self._epochs[slot] = epoch
+        return slot, True
+
+    def live(self, now: float) -> List[int]:
+        """
+        Slots that are inside the window ending at now
+        """
+        epoch = int(now // self.width)
+        return [slot for slot, held in enumerate(self._epochs)
+                if epoch - self.buckets < held <= epoch]
+
+
+class SlidingCountMin:
+    """
+    Count-min sketch over a sliding window. Estimates never undercount, and
+    overcount by at most ~e/width of the window total with probability
+    1 - e^-depth
+    """
+    def __init__(self, window: float, buckets: int = 10,
+                 width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self._ring = _Ring(window, buckets)
+        self._counts = [array('l', [0] * (width * depth))
+                        for _ in range(buckets)]
+
+    def _columns(self, key: str) -> List[int]:
+        first, second = _hashes(key)
+        return [row * self.width + (first + row * second) % self.width
+                for row in range(self.depth)]
+
+    def add(self, key: str, now: float, count: int = 1):
+        """
+        Counts key at time now
+        """
+        slot, fresh = self._ring.slot_for(now)
+        if slot < 0:
+            return
+        counts = self._counts[slot]
+        if fresh:
+            self._counts[slot] = counts = array('l', [0] * len(counts))
+        for column in self._columns(key):
+            counts[column] += count
+
+    def estimate(self, key: str, now: float) -> int:
+        """
+        Estimated count of key in the window ending at now
+        """
+        live = [self._counts[slot] for slot in self._ring.live(now)]
+        if not live:
+            return 0
+        return min(sum(counts[column] for counts in live)
+                   for column in self._columns(key))
+
+
+class SlidingHyperLogLog:
+    """
+    HyperLogLog over a sliding window, one register set per bucket merged (by
+    max) when counting. 2 ** precision registers per bucket, standard error
+    about 1.04 / sqrt(2 ** precision)
+    """
+    def __init__(self, window: float, buckets: int = 10, precision: int = 8):
+        self.precision = precision
+        self.registers = 1 << precision
+        self._ring = _Ring(window, buckets)
+        self._buckets = [bytearray(self.registers) for _ in range(buckets)]
+        self._alpha = 0.7213 / (1 + 1.079 / self.registers)
+
+    def add(self, value: str, now: float):
+        """
+        Adds value at time now
+        """
+        slot, fresh = self._ring.slot_for(now)
+        if slot < 0:
+            return
+        if fresh:
+            self._buckets[slot] = bytearray(self.registers)
+        hashed = _hashes(value)[0]
+        index = hashed >> (64 - self.precision)
+        rest = (hashed << self.precision) & 0xFFFFFFFFFFFFFFFF
+        # position of the first set bit in what's left of the hash
+        rank = 65 - rest.bit_length() if rest else 65 - self.precision
+        registers = self._buckets[slot]
+        if rank > registers[index]:
+            registers[index] = rank
+
+    def count(self, now: float) -> float:
+        """
+        Estimated distinct values in the window ending at now
+        """
+        live = [self._buckets[slot] for slot in self._ring.live(now)]
+        if not live:
+            return 0.0
+        merged = [max(values) for values in zip(*live)]
+        estimate: float = self._alpha * self.registers ** 2 / sum(
+            2.0 ** -value for value in merged)
+        zeros = merged.count(0)
+        if estimate <= 2.5 * self.registers and zeros:
+            # small range correction, linear counting
+            estimate = self.registers * log(self.registers / zeros)
+        return estimate
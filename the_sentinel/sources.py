@@ -0,0 +1,29 @@
+"""
+Where an item came from. Backfilled and replayed items are tagged so anything
+downstream (lookup priorities, say) can tell them from live ones
+"""
+from typing import Any
+
+BACKFILL = 'backfill'
+LIVE = 'live'
+_SOURCE_ATTR = 'sentinel_source'
+
+
+def item_source(item: Any) -> str:
+    """
+    Where an item came from, BACKFILL or LIVE
+    """
+    return getattr(item, _SOURCE_ATTR, LIVE)
+
+
+def tag(item: Any, source: str) -> Any:
+    """
+    Marks item as coming from source and returns it. Things that won't take
+    an attribute (strs, tuples, ...) are returned as they are, and read as
+    LIVE
+    """
+    try:
+        setattr(item, _SOURCE_ATTR, source)
+    except (AttributeError, TypeError):
+        pass
+    return item
@@ -0,0 +1,298 @@
+"""
+Sampled per-item tracing, to find out where the time goes for items that take
+ages to get from reddit to a decision. Keeps the slowest traces in memory to
+be dumped on demand (or on a signal)
+"""
+from typing import Any, Callable, Dict, IO, Iterator, List, Optional, \
+                   Tuple, TypeVar
+from collections import OrderedDict
+from contextlib import contextmanager
+import functools
+import heapq
+import itertools
+import json
+import random
+import signal
+import sys
+import threading
+import time
+
+
+class Span:
+    """
+    One named stretch of time within a trace
+    """
+    # pylint: disable=too-few-public-methods
+    __slots__ = ('name', 'start', 'end')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+
+
+class Trace:
+    """
+    Everything that happened to one item
+    """
+    __slots__ = ('label', 'start', 'end', 'spans')
+
+    def __init__(self, label: str = ''):
+        self.label = label
+        self.start = time.monotonic()
+        self.end: Optional[float] = None
+        self.spans: List[Span] = []
+
+    @property
+    def duration(self) -> float:
+        """
+        Seconds from start to finish (or to now, if not finished)
+        """
+        return (self.end or time.monotonic()) - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        """
+        json friendly version, times in ms from the start of the trace
+        """
+        def offset(when: Optional[float]) -> Optional[float]:
+            return None if when is None else round(
+                (when - self.start) * 1000, 3)
+        return {
+            'label': self.label,
+            'duration_ms': round(self.duration * 1000, 3),
+            'spans': [{'name': span.name,
+                       'start_ms': offset(span.start),
+                       'end_ms': offset(span.end)}
+                      for span in self.spans],
+            }
+
+
+class _SpanContext:
+    __slots__ = ('traces', 'span')
+
+    def __init__(self, traces: Tuple[Trace, ...], name: str):
+        self.traces = traces
+        self.span = Span(name)
+
+    def __enter__(self) -> Span:
+        for trace in self.traces:
+            trace.spans.append(self.span)
+        return self.span
+
+    def __exit__(self, *exc: Any):
+        self.span.end = time.monotonic()
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc: Any):
+        pass
+
+
+_NULL = _NullContext()
+# span()'s default, meaning "whatever traces are current on this thread"
+_CURRENT: Any = object()
+
+_T = TypeVar('_T')
+
+
+class Tracer:
+    """
+    Starts a trace for sample_rate (0-1) of items and keeps the `keep`
+    slowest finished ones. With a sample_rate of 0 every call is a single
+    attribute check.
+
+    Traces follow items through the pipeline: the producer starts one and
+    attach()es it to the item it queues, the consumer's get() resume()s it
+    to end the wait in the queue, and the consumer wraps its work on the
+    item (or a whole batch of items) in handling(), which makes their traces
+    current and finishes them at the end of the block:
+
+        with TRACER.handling(*batch):
+            resolve_links(batch)
+
+    Anything that calls span() without a trace (Youtube.request does) is
+    recorded against every current trace. Current traces are per thread, so
+    work handed to a pool goes through carry()
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self, sample_rate: float = 0.0, keep: int = 50,
+                 max_attached: int = 10000):
+        self.sample_rate = sample_rate
+        self.keep = keep
+        self.max_attached = max_attached
+        self._slowest: List[Tuple[float, int, Trace]] = []
+        self._counter = itertools.count()
+        self._attached: 'OrderedDict[int, Tuple[Any, Trace]]' = OrderedDict()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def start(self, label: Any = '') -> Optional[Trace]:
+        """
+        A new trace if this item is sampled, None otherwise. label is only
+        str()ed if it is
+        """
+        if not self.sample_rate or random.random() >= self.sample_rate:
+            return None
+        return Trace(str(label))
+
+    def span(self, name: str, trace: Any = _CURRENT):
+        """
+        Context manager recording a span in trace (by default the thread's
+        current traces). Does nothing if there's no trace
+        """
+        if trace is _CURRENT:
+            traces = self.current()
+        else:
+            traces = () if trace is None else (trace,)
+        if not traces:
+            return _NULL
+        return _SpanContext(traces, name)
+
+    def attach(self, item: Any, trace: Optional[Trace]):
+        """
+        Hands trace over with item (on its way into a queue, say). Starts a
+        'queue' span that resume() ends
+        """
+        if trace is None:
+            return
+        span = Span('queue')
+        trace.spans.append(span)
+        with self._lock:
+            self._attached[id(item)] = (item, trace)
+            while len(self._attached) > self.max_attached:
+                # consumer has gone away, don't hold on to things forever
+                self._attached.popitem(last=False)
+
+    def _attached_trace(self, item: Any, pop: bool = False) -> Optional[Trace]:
+        if not self._attached:
+            return None
+        with self._lock:
+            if pop:
+                _, trace = self._attached.pop(id(item), (None, None))
+            else:
+                _, trace = self._attached.get(id(item), (None, None))
+        return trace
+
+    def resume(self, item: Any) -> Optional[Trace]:
+        """
+        Called when a consumer takes item off the queue. Ends the 'queue'
+        span of item's trace, if it has one, and returns the trace
+        """
+        trace = self._attached_trace(item)
+        if trace is not None:
+            for span in reversed(trace.spans):
+                if span.name == 'queue':
+                    if span.end is None:
+                        span.end = time.monotonic()
+                    break
+        return trace
+
+    @contextmanager
+    def handling(self, *items: Any) -> Iterator[Tuple[Trace, ...]]:
+        """
+        Makes the traces of items current for the block, and finishes them
+        when it ends
+        """
+        traces = tuple(trace for trace in map(self.resume, items)
+                       if trace is not None)
+        if not traces:
+            yield traces
+            return
+        outer = self.current()
+        self._local.traces = outer + traces
+        try:
+            yield traces
+        finally:
+            self._local.traces = outer
+            for item in items:
+                self.finish(item)
+
+    def current(self) -> Tuple[Trace, ...]:
+        """
+        This thread's current traces
+        """
+        return getattr(self._local, 'traces', ())
+
+    def carry(self, func: Callable[..., _T]) -> Callable[..., _T]:
+        """
+        func, wrapped to record its spans against the traces current here
+        and now, for handing to another thread
+        """
+        traces = self.current()
+        if not traces:
+            return func
+
+        @functools.wraps(func)
+        def carried(*args: Any, **kwargs: Any) -> _T:
+            outer = self.current()
+            self._local.traces = traces
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._local.traces = outer
+        return carried
+
+    def finish(self, item_or_trace: Any):
+        """
+        Ends a trace (or the trace attached to an item) and keeps it if it's
+        one of the slowest. Does nothing for None or an item without a trace
+        """
+        if isinstance(item_or_trace, Trace):
+            trace: Optional[Trace] = item_or_trace
+        else:
+            trace = self._attached_trace(item_or_trace, pop=True)
+        if trace is None:
+            return
+        trace.end = time.monotonic()
+        entry = (trace.duration, next(self._counter), trace)
+        with self._lock:
+            if len(self._slowest) < self.keep:
+                heapq.heappush(self._slowest, entry)
+            elif entry[0] > self._slowest[0][0]:
+                heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> List[Trace]:
+        """
+        Kept traces, slowest first
+        """
+        with self._lock:
+            entries = sorted(self._slowest, reverse=True)
+        return [trace for _, _, trace in entries]
+
+    def dump(self, out: Optional[IO[str]] = None) -> str:
+        """
+        The slowest traces as json, also written to out if given
+        """
+        dumped = json.dumps([trace.to_dict() for trace in self.slowest()],
+                            indent=2)
+        if out is not None:
+            out.write(dumped + '\n')
+            out.flush()
+        return dumped
+
+    def _dump_in_thread(self, out: IO[str]) -> threading.Thread:
+        # a signal handler runs on top of whatever the main thread was doing,
+        # which might be holding _lock
+        thread = threading.Thread(target=self.dump, args=(out,),
+                                  name='trace-dump', daemon=True)
+        thread.start()
+        return thread
+
+    def install_signal_handler(self, signum: Optional[int] = None,
+                               out: IO[str] = sys.stderr):
+        """
+        Dumps to out whenever the process gets signum (SIGUSR1 by default).
+        The dump is written from its own thread
+        """
+        if signum is None:
+            signum = signal.SIGUSR1
+        signal.signal(signum, lambda *_: self._dump_in_thread(out))
+
+
+# shared by the whole pipeline, off until sample_rate is set
+TRACER = Tracer()
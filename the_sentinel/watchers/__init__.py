@@ -1,4 +1,18 @@
 """
 Modules for watching and gathering information from various apis
 """
-from .reddit import RedditWatcher
+from typing import TYPE_CHECKING
+from .._lazy import lazy
+
+if TYPE_CHECKING: # pragma: no cover
+    from .reddit import RedditWatcher
+    from .sharded import ShardedRedditWatcher
+    from .backfill import BackfillWatcher
+    from .dumps import DumpWatcher
+
+lazy(__name__, {
+    'RedditWatcher': '.reddit:RedditWatcher',
+    'ShardedRedditWatcher': '.sharded:ShardedRedditWatcher',
+    'BackfillWatcher': '.backfill:BackfillWatcher',
+    'DumpWatcher': '.dumps:DumpWatcher',
+    })
@@ -0,0 +1,108 @@
+"""
+Reprocessing things reddit already has, by fullname, at /api/info speed rather
+than one request per item
+"""
+from typing import Any, Callable, Deque, Iterable, Iterator, List, Optional, \
+                   Union, TYPE_CHECKING
+from collections import deque
+from itertools import islice
+import asyncio
+from ..sources import BACKFILL, tag
+from ..tracing import TRACER
+from .executors import reddit_executor
+if TYPE_CHECKING: # pragma: no cover
+    import praw
+    from .fairqueue import SubQueue
+
+# most /api/info will take at once
+CHUNK_SIZE = 100
+
+
+def _chunks(fullnames: Iterable[str], size: int) -> Iterator[List[str]]:
+    fullnames = iter(fullnames)
+    while True:
+        chunk = list(islice(fullnames, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class BackfillWatcher:
+    """
+    Feeds existing comments and submissions, given as fullnames (t1_..,
+    t3_..), into a queue the same way SubredditWatcher feeds new ones.
+
+    Fullnames are looked up through reddit.info() CHUNK_SIZE at a time, so
+    100k items is ~1000 requests rather than 100k. Up to `prefetch` chunks
+    are queued on the reddit instance's thread (see executors), so requests
+    keep going while earlier chunks are put. fullnames can be any iterable
+    (a generator over a huge file is fine), it's only read a chunk at a
+    time. Items, and what item_callback makes of them, are tagged so
+    anything downstream can tell them from live ones with
+    sources.item_source(). Fullnames reddit doesn't return (deleted, typos)
+    are counted in `missing`
+    """
+    def __init__(self,
+                 reddit: 'praw.Reddit',
+                 fullnames: Iterable[str],
+                 queue: Optional[Union['asyncio.Queue[Any]',
+                                       'SubQueue']] = None,
+                 prefetch: int = 4):
+        self.reddit = reddit
+        self.fullnames = fullnames
+
+        if queue is None:
+            queue = asyncio.Queue()
+        self._outqueue = queue
+
+        self.prefetch = prefetch
+        self.fetched = 0
+        self.missing = 0
+        self._kill = False
+
+    def _fetch(self, chunk: List[str]) -> List[Any]:
+        """
+        One /api/info call, runs in a thread
+        """
+        return [tag(item, BACKFILL)
+                for item in self.reddit.info(fullnames=chunk)]
+
+    async def watch(self,
+                    item_callback: Callable[[Any], Any] = lambda x: x):
+        """
+        Fetches everything and puts it (through item_callback) into the
+        queue, returns once it's all been put
+        """
+        executor = reddit_executor(self.reddit)
+        chunks = _chunks(self.fullnames, CHUNK_SIZE)
+        pending: Deque[Any] = deque()
+        try:
+            while not self._kill:
+                # keep the next few requests going while this chunk is put
+                while len(pending) < self.prefetch:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    pending.append((len(chunk), asyncio.wrap_future(
+                        executor.submit(self._fetch, chunk))))
+                if not pending:
+                    break
+                asked, fetching = pending.popleft()
+                items = await fetching
+                self.fetched += len(items)
+                self.missing += asked - len(items)
+                for item in items:
+                    trace = TRACER.start(BACKFILL)
+                    with TRACER.span('callback', trace):
+                        item = tag(item_callback(item), BACKFILL)
+                    TRACER.attach(item, trace)
+                    await self._outqueue.put(item)
+        finally:
+            for _, fetching in pending:
+                fetching.cancel()
+
+    def kill(self):
+        """
+        Stop fetching after the current chunk
+        """
+        self._kill = True
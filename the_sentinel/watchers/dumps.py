@@ -0,0 +1,224 @@
+"""
+Replaying archived comments and submissions (NDJSON dumps, optionally zstd
+compressed) through the same checks as live ones
+"""
+from typing import Any, Callable, Dict, IO, Iterable, Iterator, List, \
+                   Optional, Tuple
+from itertools import islice
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+from ..sources import BACKFILL, tag
+
+# (path, start, end) byte range of a dump, end None meaning the whole file
+Part = Tuple[str, int, Optional[int]]
+
+# zstd dumps are written with long windows, the default limit refuses them
+ZSTD_WINDOW = 2 ** 31
+READ_BUFFER = 1 << 20
+
+
+class DumpItem:
+    """
+    The parts of an archived comment or submission the checks look at. Has
+    the same attribute names as the praw objects, so callbacks written for
+    live items work on these too. Comments have body, submissions have
+    title, selftext and url, everything else is None
+    """
+    # a plain record, slotted since there are millions of them
+    # pylint: disable=too-many-instance-attributes,too-few-public-methods
+    __slots__ = ('fullname', 'id', 'subreddit', 'author', 'created_utc',
+                 'body', 'title', 'selftext', 'url')
+    # see sources.item_source
+    sentinel_source = BACKFILL
+
+    def __init__(self, data: Dict[str, Any]):
+        get = data.get
+        self.id = get('id')
+        fullname = get('name')
+        if not fullname:
+            fullname = ('t1_' if 'body' in data else 't3_') + str(self.id)
+        self.fullname = fullname
+        self.subreddit = get('subreddit')
+        self.author = get('author')
+        self.created_utc = get('created_utc')
+        self.body = get('body')
+        self.title = get('title')
+        self.selftext = get('selftext')
+        self.url = get('url')
+
+    def __repr__(self) -> str:
+        return f'DumpItem({self.fullname})'
+
+
+def _open_zstd(path: str) -> IO[bytes]:
+    try:
+        import zstandard # pylint: disable=import-outside-toplevel
+    except ImportError:
+        raise RuntimeError(
+            "Reading .zst dumps needs zstandard "
+            "(pip install the_sentinel[dumps])") from None
+    # handed over to the reader, which closes it
+    raw = open(path, 'rb') # pylint: disable=consider-using-with
+    try:
+        reader = zstandard.ZstdDecompressor(
+            max_window_size=ZSTD_WINDOW).stream_reader(raw, closefd=True)
+    except BaseException:
+        raw.close()
+        raise
+    return io.BufferedReader(reader, READ_BUFFER)
+
+
+def _lines(path: str, start: int = 0,
+           end: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Raw lines of a dump. For plain files only lines that start inside
+    [start, end) are given, so neighbouring ranges never share or split a
+    line
+    """
+    if path.endswith('.zst'):
+        if start or end is not None:
+            raise RuntimeError("Compressed dumps can't be read by offset")
+        with _open_zstd(path) as dump:
+            yield from dump
+        return
+    with open(path, 'rb', buffering=READ_BUFFER) as dump:
+        if start:
+            # a line that starts before start belongs to the previous range
+            dump.seek(start - 1)
+            dump.readline()
+        if end is None:
+            yield from dump
+            return
+        position = dump.tell()
+        while position < end:
+            line = dump.readline()
+            if not line:
+                return
+            position += len(line)
+            yield line
+
+
+def read_dump(path: str, start: int = 0,
+              end: Optional[int] = None) -> Iterator[DumpItem]:
+    """
+    Streams DumpItems out of a dump, a line at a time so memory stays flat
+    however big it is. Blank and corrupt lines (truncated dumps have them) are
+    skipped
+    """
+    for line in _lines(path, start, end):
+        try:
+            data = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(data, dict):
+            yield DumpItem(data)
+
+
+def split(paths: Iterable[str], part_size: int = 64 << 20) -> List[Part]:
+    """
+    Cuts dumps into ranges of about part_size bytes that can be read
+    independently. Compressed dumps can't be split, so they're one part each
+    """
+    parts: List[Part] = []
+    for path in paths:
+        size = os.path.getsize(path)
+        if path.endswith('.zst') or size <= part_size:
+            parts.append((path, 0, None))
+            continue
+        parts.extend((path, start, min(start + part_size, size))
+                     for start in range(0, size, part_size))
+    return parts
+
+
+def _replay_part(args: Tuple[Part, Callable[[DumpItem], Any]]) -> List[Any]:
+    (path, start, end), callback = args
+    results = []
+    for item in read_dump(path, start, end):
+        result = callback(item)
+        if result is not None:
+            results.append(result)
+    return results
+
+
+def replay(paths: Iterable[str],
+           callback: Callable[[DumpItem], Any],
+           processes: Optional[int] = None,
+           part_size: int = 64 << 20) -> Iterator[Any]:
+    """
+    Runs callback over every item in the dumps, split over `processes`
+    processes (one per cpu by default), and yields whatever it returns that
+    isn't None, in no particular order. Return None for the uninteresting
+    items (most of them, hopefully), anything else is collected per part and
+    sent back.
+
+    callback has to be picklable, so a module level function
+    """
+    tasks = [(part, callback) for part in split(paths, part_size)]
+    if processes == 1:
+        for task in tasks:
+            yield from _replay_part(task)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for results in pool.imap_unordered(_replay_part, tasks):
+            yield from results
+
+
+def _take(items: Iterator[DumpItem], count: int) -> List[DumpItem]:
+    return list(islice(items, count))
+
+
+class DumpWatcher:
+    """
+    Feeds dumps into a queue the way SubredditWatcher feeds live items, for
+    running archives through an existing RedditWatcher consumer. Reading
+    happens in a thread, batch_size items at a time, and stops while the
+    queue has more than max_pending items waiting so memory stays bounded
+    """
+    def __init__(self,
+                 paths: Iterable[str],
+                 queue: Optional[Any] = None,
+                 batch_size: int = 1000,
+                 max_pending: int = 10000):
+        self.paths = list(paths)
+
+        if queue is None:
+            queue = asyncio.Queue()
+        self._outqueue = queue
+
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.read = 0
+        self._kill = False
+
+    async def watch(self,
+                    item_callback: Callable[[DumpItem], Any] = lambda x: x):
+        """
+        Reads everything and puts it (through item_callback) into the queue,
+        returns once it's all been put
+        """
+        loop = asyncio.get_event_loop()
+        for path in self.paths:
+            items = read_dump(path)
+            while not self._kill:
+                batch = await loop.run_in_executor(
+                    None, _take, items, self.batch_size)
+                if not batch:
+                    break
+                self.read += len(batch)
+                for item in batch:
+                    await self._outqueue.put(
+                        tag(item_callback(item), BACKFILL))
+                while self._outqueue.qsize() > self.max_pending \
+                        and not self._kill:
+                    await asyncio.sleep(0.05)
+            if self._kill:
+                return
+
+    def kill(self):
+        """
+        Stop reading after the current batch
+        """
+        self._kill = True
@@ -0,0 +1,25 @@
+"""
+Threads for talking to reddit. praw isn't thread safe, so each praw.Reddit
+gets exactly one
+"""
+from typing import Any
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import weakref
+
+_EXECUTORS: 'weakref.WeakKeyDictionary[Any, ThreadPoolExecutor]'
+_EXECUTORS = weakref.WeakKeyDictionary()
+_LOCK = threading.Lock()
+
+
+def reddit_executor(reddit: Any) -> ThreadPoolExecutor:
+    """
+    The single worker thread everything using reddit should make its
+    blocking calls on. Calls from every watcher sharing a praw.Reddit queue
+    up there instead of using it from several threads at once
+    """
+    with _LOCK:
+        if reddit not in _EXECUTORS:
+            _EXECUTORS[reddit] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix='reddit')
+        return _EXECUTORS[reddit]
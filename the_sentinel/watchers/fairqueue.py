@@ -0,0 +1,238 @@
+"""
+Fair merging of several producers into one asyncio queue, so one busy
+subreddit can't starve the rest
+"""
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from collections import OrderedDict, deque
+import asyncio
+
+
+class FairQueue:
+    """
+    Looks like an asyncio.Queue to consumers, but keeps a sub-queue per key
+    and hands items out by deficit round robin. Each key gets `weight` items
+    per round (weights below 1 build up over several rounds), so however
+    deep a noisy key's backlog is, a quiet key's items only wait for one
+    round.
+
+    Producers put through subqueue(key), which behaves like an asyncio.Queue
+    restricted to that key
+    """
+    # pylint: disable=too-many-instance-attributes
+    def __init__(self,
+                 weights: Optional[Dict[str, float]] = None,
+                 default_weight: float = 1):
+        if default_weight <= 0:
+            raise RuntimeError("Weights must be positive")
+        self.default_weight = default_weight
+        self.weights: Dict[str, float] = {}
+        # a weight of 0 would never build up enough credit to hand anything
+        # out, and get() would spin forever
+        for key, weight in (weights or {}).items():
+            self.set_weight(key, weight)
+        # keys with items waiting, in round robin order
+        self._active: 'OrderedDict[str, Deque[Any]]' = OrderedDict()
+        self._deficit: Dict[str, float] = {}
+        # key whose turn it is
+        self._turn: Optional[str] = None
+        self._subqueues: Dict[str, SubQueue] = {}
+        self._getters: List[Tuple[Optional[str], asyncio.Future]] = []
+        self._size = 0
+        self.puts: Dict[str, int] = {}
+        self.gets: Dict[str, int] = {}
+        self.max_depths: Dict[str, int] = {}
+
+    def subqueue(self, key: str) -> 'SubQueue':
+        """
+        The producer side handle for key
+        """
+        if key not in self._subqueues:
+            self._subqueues[key] = SubQueue(self, key)
+        return self._subqueues[key]
+
+    def weight(self, key: str) -> float:
+        """
+        Items per round for key
+        """
+        return self.weights.get(key, self.default_weight)
+
+    def set_weight(self, key: str, weight: float):
+        """
+        Changes how many items per round key gets
+        """
+        if weight <= 0:
+            raise RuntimeError("Weights must be positive")
+        self.weights[key] = weight
+
+    def depths(self) -> Dict[str, int]:
+        """
+        Items waiting per key
+        """
+        return {key: len(queue) for key, queue in self._active.items()}
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Per key depth, high water mark, and put/get counts
+        """
+        depths = self.depths()
+        return {key: {'depth': depths.get(key, 0),
+                      'max_depth': self.max_depths.get(key, 0),
+                      'puts': self.puts.get(key, 0),
+                      'gets': self.gets.get(key, 0)}
+                for key in self.puts}
+
+    def qsize(self) -> int:
+        """
+        Items waiting over all keys
+        """
+        return self._size
+
+    def empty(self) -> bool:
+        """
+        Whether nothing is waiting for any key
+        """
+        return self._size == 0
+
+    def put_nowait(self, key: str, item: Any):
+        """
+        Adds an item for key, never blocks
+        """
+        if key not in self._active:
+            self._active[key] = deque()
+            self._deficit[key] = 0
+        queue = self._active[key]
+        queue.append(item)
+        self._size += 1
+        self.puts[key] = self.puts.get(key, 0) + 1
+        self.max_depths[key] = max(self.max_depths.get(key, 0), len(queue))
+        self._wakeup(key)
+
+    async def put(self, key: str, item: Any):
+        """
+        Same as put_nowait, sub-queues are unbounded
+        """
+        self.put_nowait(key, item)
+
+    def get_nowait(self, key: Optional[str] = None) -> Any:
+        """
+        Next item by deficit round robin, or the next item for key if it's
+        given. Raises asyncio.QueueEmpty if there isn't one
+        """
+        if key is not None:
+            if key not in self._active:
+                raise asyncio.QueueEmpty
+            return self._take(key)
+        if not self._size:
+            raise asyncio.QueueEmpty
+        while True:
+            key = next(iter(self._active))
+            if self._turn != key:
+                self._turn = key
+                self._deficit[key] += self.weight(key)
+            if self._deficit[key] >= 1:
+                self._deficit[key] -= 1
+                return self._take(key)
+            # key's turn is over, on to the next
+            self._active.move_to_end(key)
+            self._turn = None
+
+    async def get(self, key: Optional[str] = None) -> Any:
+        """
+        Waits for an item, see get_nowait
+        """
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                return self.get_nowait(key)
+            except asyncio.QueueEmpty:
+                pass
+            getter = loop.create_future()
+            self._getters.append((key, getter))
+            try:
+                await getter
+            except BaseException:
+                if (key, getter) in self._getters:
+                    self._getters.remove((key, getter))
+                elif not getter.cancelled():
+                    # we were woken for an item and then cancelled, so
+                    # whoever else is waiting gets a look at it instead
+                    self._wakeup_all()
+                raise
+
+    def _take(self, key: str) -> Any:
+        queue = self._active[key]
+        item = queue.popleft()
+        if not queue:
+            # idle keys don't keep their deficit
+            del self._active[key]
+            self._deficit[key] = 0
+            if self._turn == key:
+                self._turn = None
+        self._size -= 1
+        self.gets[key] = self.gets.get(key, 0) + 1
+        return item
+
+    def _wakeup(self, key: str):
+        """
+        Wakes the first getter that would take an item for key
+        """
+        for waiting in self._getters:
+            waiting_key, getter = waiting
+            if waiting_key is None or waiting_key == key:
+                self._getters.remove(waiting)
+                if not getter.done():
+                    getter.set_result(None)
+                return
+
+    def _wakeup_all(self):
+        getters, self._getters = self._getters, []
+        for _, getter in getters:
+            if not getter.done():
+                getter.set_result(None)
+
+
+class SubQueue:
+    """
+    One key's view of a FairQueue, with the asyncio.Queue methods
+    SubredditWatcher uses
+    """
+    def __init__(self, parent: FairQueue, key: str):
+        self.parent = parent
+        self.key = key
+
+    def put_nowait(self, item: Any):
+        """
+        Adds an item under this key
+        """
+        self.parent.put_nowait(self.key, item)
+
+    async def put(self, item: Any):
+        """
+        Adds an item under this key
+        """
+        await self.parent.put(self.key, item)
+
+    def get_nowait(self) -> Any:
+        """
+        Takes this key's next item, raises asyncio.QueueEmpty if there isn't
+        one
+        """
+        return self.parent.get_nowait(self.key)
+
+    async def get(self) -> Any:
+        """
+        Waits for this key's next item
+        """
+        return await self.parent.get(self.key)
+
+    def qsize(self) -> int:
+        """
+        Items waiting under this key
+        """
+        return self.parent.depths().get(self.key, 0)
+
+    def empty(self) -> bool:
+        """
+        Whether nothing is waiting under this key
+        """
+        return self.qsize() == 0
@@ -1,75 +1,275 @@
 """
 Classes dedicated to watching and gathering posts and comments from reddit
 """
-from typing import Union, Callable, Any, Optional, List, TYPE_CHECKING
+from typing import Union, Callable, Any, Optional, List, Dict, Iterable, \
+                   Tuple, TYPE_CHECKING
+from concurrent.futures import Future
 import asyncio
 import praw
+from ..tracing import TRACER
+from .fairqueue import FairQueue, SubQueue
+from ..sources import BACKFILL
+from .backfill import BackfillWatcher
+from .dumps import DumpWatcher
+from .executors import reddit_executor
 # types
 # pylint: disable=invalid-name
 StreamTarget = Callable[..., praw.models.ListingGenerator]
 if TYPE_CHECKING: # pragma: no cover
+    from typing_extensions import Protocol
     RedditQueue = asyncio.Queue[praw.models.reddit.base.RedditBase]
+
+    class ItemQueue(Protocol):
+        """
+        The consumer side of a queue, what _drain and _get_batch need.
+        asyncio.Queue, FairQueue and SubQueue all fit
+        """
+        async def get(self) -> Any:
+            """
+            Waits for the next item
+            """
+
+        def get_nowait(self) -> Any:
+            """
+            The next item, raises asyncio.QueueEmpty if there isn't one
+            """
+
+        def empty(self) -> bool:
+            """
+            Whether nothing is waiting
+            """
 else:
     RedditQueue = asyncio.Queue
+    ItemQueue = Any
 # pylint: enable=invalid-name
 
+# the sub-queue backfilled and replayed items share. Can't be a subreddit
+# name, so it never shares a queue or weight with a real subreddit
+BACKFILL_QUEUE = f'<{BACKFILL}>'
+
+# returned by next() when a stream runs out, streams can yield None on their own
+_STREAM_END = object()
+
+
+async def _drain(queue: ItemQueue,
+                 deadline: float) -> List[Any]:
+    """
+    Gives the consumer until deadline (in loop time) to empty queue, then
+    takes whatever is left so it can be handed back instead of dropped
+    """
+    loop = asyncio.get_event_loop()
+    while not queue.empty() and loop.time() < deadline:
+        await asyncio.sleep(min(0.05, deadline - loop.time()))
+    leftover = []
+    while not queue.empty():
+        leftover.append(queue.get_nowait())
+    return leftover
+
+
+async def _get_batch(queue: ItemQueue,
+                     max_items: int,
+                     max_wait: float) -> List[Any]:
+    """
+    Waits for at least one item, then keeps collecting until there are
+    max_items or max_wait seconds have passed since the first one
+    """
+    batch = [await queue.get()]
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + max_wait
+    while len(batch) < max_items:
+        # anything already waiting can be taken without a wakeup per item
+        while len(batch) < max_items and not queue.empty():
+            batch.append(queue.get_nowait())
+        remaining = deadline - loop.time()
+        if len(batch) >= max_items or remaining <= 0:
+            break
+        try:
+            batch.append(await asyncio.wait_for(queue.get(), remaining))
+        except asyncio.TimeoutError:
+            break
+    return batch
+
 class RedditWatcher:
     """
     Aggregates and manages SubredditWatcher instances
+
+    Every watcher gets its own sub-queue, and get() takes from them in
+    (weighted) round robin, so one very busy subreddit can't starve the
+    others. weights maps lowercase subreddit names to items per round, 1 by
+    default. Backfilled and replayed items all share the BACKFILL_QUEUE
+    ('<backfill>') sub-queue, so give it a weight below 1 (in weights or
+    with set_weight) to keep a big backfill from slowing live items down
     """
     def __init__(self,
                  reddit: praw.Reddit,
-                 watchers: Optional[List['SubredditWatcher']] = None):
+                 watchers: Optional[List['SubredditWatcher']] = None,
+                 weights: Optional[Dict[str, float]] = None):
         self.reddit = reddit
-        self._outqueue: RedditQueue
-        self._outqueue = asyncio.Queue()
+        self._outqueue: FairQueue
+        self._outqueue = FairQueue(weights)
 
         if watchers is None:
             watchers = []
         self.watchers: List[SubredditWatcher]
         self.watchers = watchers
+        self.backfills: List[Union[BackfillWatcher, DumpWatcher]] = []
+        self._tasks: List[asyncio.Task] = []
 
     def watch(self, **kwargs: Any):
         """
         Creates tasks for all watcher instances, passing down stream arguments
         """
         for watcher in self.watchers:
-            asyncio.get_event_loop().create_task(
+            self._tasks.append(asyncio.get_event_loop().create_task(
                 watcher.watch(**kwargs)
-                )
+                ))
 
-    def add_watcher(self, subreddit: Union[praw.models.Subreddit, str]):
+    def add_watcher(self, subreddit: Union[praw.models.Subreddit, str]
+                   ) -> 'SubredditWatcher':
         """
         Adds a watcher
         """
-        watcher = SubredditWatcher(self.reddit, subreddit, self._outqueue)
+        watcher = SubredditWatcher(
+            self.reddit, subreddit,
+            self._outqueue.subqueue(str(subreddit).lower()))
         if watcher in self.watchers:
             raise RuntimeError(
                 "You may not have multiple watchers for a single subreddit")
         self.watchers.append(watcher)
+        return watcher
 
-    def kill(self): # pragma: no cover
+    def backfill(self, fullnames: Iterable[str],
+                 item_callback: Callable[[Any], Any] = lambda x: x,
+                 prefetch: int = 4) -> BackfillWatcher:
         """
-        Cleanly kill all watchers
+        Starts feeding existing items, by fullname, into the queue alongside
+        the live ones. See BackfillWatcher
+        """
+        watcher = BackfillWatcher(self.reddit, fullnames,
+                                  self._outqueue.subqueue(BACKFILL_QUEUE),
+                                  prefetch=prefetch)
+        self.backfills.append(watcher)
+        self._tasks.append(asyncio.get_event_loop().create_task(
+            watcher.watch(item_callback=item_callback)))
+        return watcher
+
+    def replay(self, paths: Iterable[str],
+               item_callback: Callable[[Any], Any] = lambda x: x
+              ) -> DumpWatcher:
+        """
+        Starts feeding archived items from dump files into the queue, on the
+        same sub-queue as backfill. See dumps.DumpWatcher
+        """
+        watcher = DumpWatcher(paths, self._outqueue.subqueue(BACKFILL_QUEUE))
+        self.backfills.append(watcher)
+        self._tasks.append(asyncio.get_event_loop().create_task(
+            watcher.watch(item_callback=item_callback)))
+        return watcher
+
+    def remove_watcher(self, subreddit: Union[praw.models.Subreddit, str]):
+        """
+        Kills and removes the watcher for a subreddit
+        """
+        name = str(subreddit).lower()
+        for watcher in self.watchers:
+            if str(watcher.subreddit).lower() == name:
+                watcher.kill()
+                self.watchers.remove(watcher)
+                return
+        raise RuntimeError(f"No watcher for {subreddit}")
+
+    def kill(self):
+        """
+        Kill all watchers, see SubredditWatcher.kill. Items already in the
+        queue stay there
         """
         for watcher in self.watchers:
             watcher.kill()
+        for backfill in self.backfills:
+            backfill.kill()
+        for task in self._tasks:
+            task.cancel()
 
-    async def get(self): # pragma: no cover
+    def set_weight(self, subreddit: Union[praw.models.Subreddit, str],
+                   weight: float):
         """
-        Trivial wrapper for asyncio.Queue.get
+        Sets how many items per round a subreddit (or BACKFILL_QUEUE) gets
+        from get()
+        """
+        self._outqueue.set_weight(str(subreddit).lower(), weight)
+
+    def depths(self) -> Dict[str, int]:
+        """
+        Items waiting per subreddit
+        """
+        return self._outqueue.depths()
+
+    async def shutdown(self, timeout: float = 10,
+                       drain: bool = True) -> List[Any]:
         """
-        return await self._outqueue.get()
+        Kills all watchers and waits (at most timeout seconds in total) for
+        them to stop. If drain is set the consumer gets whatever time is left
+        to empty the queue.
+
+        Returns any items that were never consumed (including ones from
+        requests that were still running when the watchers were killed), so
+        the caller can decide what to do with them rather than them just
+        vanishing
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        self.kill()
+        tasks = [task for watcher in self.watchers for task in watcher.tasks]
+        tasks.extend(self._tasks)
+        if tasks:
+            await asyncio.wait(tasks, timeout=timeout)
+        self._tasks = []
+        leftover = []
+        for watcher in self.watchers:
+            leftover.extend(
+                await watcher.abandoned(deadline if drain else 0))
+        return leftover + await _drain(self._outqueue,
+                                       deadline if drain else 0)
+
+    async def get(self):
+        """
+        Trivial wrapper for asyncio.Queue.get. Also where a sampled item's
+        time in the queue ends, wrap the work on it in TRACER.handling(item)
+        to trace the rest (see tracing.Tracer)
+        """
+        item = await self._outqueue.get()
+        TRACER.resume(item)
+        return item
+
+    async def get_batch(self, max_items: int = 100,
+                        max_wait: float = 1) -> List[Any]:
+        """
+        Gets up to max_items at once, waiting at most max_wait seconds after
+        the first item for the rest to show up. Traces work the same as
+        get(), TRACER.handling(*batch) handles them all at once
+        """
+        batch = await _get_batch(self._outqueue, max_items, max_wait)
+        for item in batch:
+            TRACER.resume(item)
+        return batch
+
+    async def batches(self, max_items: int = 100, max_wait: float = 1):
+        """
+        Async iterator of get_batch results, forever
+        """
+        while True:
+            yield await self.get_batch(max_items, max_wait)
 
 class SubredditWatcher:
     """
     Gathers comments, submissions (any RedditBase derived classes) from a
     single subreddit.
     """
+    # pylint: disable=too-many-instance-attributes
     def __init__(self,
                  reddit: praw.Reddit,
                  subreddit: Union[praw.models.Subreddit, str],
-                 queue: Optional[RedditQueue] = None):
+                 queue: Optional[Union[RedditQueue, SubQueue]] = None):
         self.reddit = reddit
 
         if queue is None:
@@ -87,6 +287,17 @@ class SubredditWatcher:
         self.watching: List[StreamTarget]
         self.watching = []
         self._kill = False
+        self._tasks: List[asyncio.Task] = []
+        # fetches kill() cancelled while they were running, with the
+        # callback their item would have gone through
+        self._abandoned: List[Tuple[Future, Callable[[Any], Any]]] = []
+
+    @property
+    def tasks(self) -> List[asyncio.Task]:
+        """
+        Tasks for streams this watcher has started
+        """
+        return self._tasks
 
     async def watch(self,
                     stream_target: Optional[StreamTarget] = None,
@@ -104,31 +315,116 @@ class SubredditWatcher:
         """
         if stream_target is None:
             for stream in self._streams:
-                asyncio.get_event_loop().create_task(
+                self._tasks.append(asyncio.get_event_loop().create_task(
                     self.watch(stream,
                                item_callback=item_callback,
-                               pause_after=pause_after, **kwargs))
+                               pause_after=pause_after, **kwargs)))
             return
 
         if stream_target in self.watching:
             raise RuntimeError("You may only watch a given stream one time")
         self.watching.append(stream_target)
-        for item in stream_target(pause_after=pause_after, **kwargs):
-            if self._kill:
+        executor = reddit_executor(self.reddit)
+        stream = iter(stream_target(pause_after=pause_after, **kwargs))
+        while not self._kill:
+            trace = TRACER.start(self.subreddit)
+            # streams block on http requests, so pull them on the reddit
+            # instance's thread. That keeps the loop free, and lets kill()
+            # cancel us without waiting for the request to finish
+            with TRACER.span('fetch', trace):
+                fetching = executor.submit(next, stream, _STREAM_END)
+                try:
+                    item = await asyncio.wrap_future(fetching)
+                except asyncio.CancelledError:
+                    self._abandoned.append((fetching, item_callback))
+                    raise
+            if item is _STREAM_END:
                 break
             if item is None:
-                await asyncio.sleep(0)
                 continue
-            await self._outqueue.put(item_callback(item))
+            with TRACER.span('callback', trace):
+                item = item_callback(item)
+            TRACER.attach(item, trace)
+            await self._outqueue.put(item)
 
-    def kill(self): # pragma: no cover
+    def kill(self):
         """
-        Cleanly kill all watched streams
+        Kill all watched streams. A request that's already running can't be
+        stopped, but nothing waits for it either. Whatever it brings back is
+        handed over by shutdown()
         """
         self._kill = True
+        for task in self._tasks:
+            task.cancel()
+
+    async def abandoned(self, deadline: float) -> List[Any]:
+        """
+        Items from requests kill() left running, waiting until deadline (in
+        loop time) for them to finish. Ones still running after that are
+        kept for the next call
+        """
+        loop = asyncio.get_event_loop()
+        items = []
+        running = []
+        for fetching, item_callback in self._abandoned:
+            if fetching.cancelled():
+                # never started, so there's no item to lose
+                continue
+            try:
+                item = await asyncio.wait_for(
+                    asyncio.wrap_future(fetching),
+                    max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                running.append((fetching, item_callback))
+                continue
+            except Exception: # pylint: disable=broad-except
+                # the request failed, no item to lose either
+                continue
+            if item is not None and item is not _STREAM_END:
+                items.append(item_callback(item))
+        self._abandoned = running
+        return items
+
+    async def shutdown(self, timeout: float = 10,
+                       drain: bool = True) -> List[Any]:
+        """
+        Same as RedditWatcher.shutdown, for a watcher used on its own
+        """
+        loop = asyncio.get_event_loop()
+        deadline = loop.time() + timeout
+        self.kill()
+        if self._tasks:
+            await asyncio.wait(self._tasks, timeout=timeout)
+        self._tasks = []
+        leftover = await self.abandoned(deadline if drain else 0)
+        return leftover + await _drain(self._outqueue,
+                                       deadline if drain else 0)
+
+    async def get(self):
+        """
+        Trivial wrapper for asyncio.Queue.get. Also where a sampled item's
+        time in the queue ends, wrap the work on it in TRACER.handling(item)
+        to trace the rest (see tracing.Tracer)
+        """
+        item = await self._outqueue.get()
+        TRACER.resume(item)
+        return item
+
+    async def get_batch(self, max_items: int = 100,
+                        max_wait: float = 1) -> List[Any]:
+        """
+        Gets up to max_items at once, waiting at most max_wait seconds after
+        the first item for the rest to show up. Traces work the same as
+        get(), TRACER.handling(*batch) handles them all at once
+        """
+        batch = await _get_batch(self._outqueue, max_items, max_wait)
+        for item in batch:
+            TRACER.resume(item)
+        return batch
 
-    async def get(self): # pragma: no cover
+    async def batches(self, max_items: int = 100, max_wait: float = 1):
         """
-        Trivial wrapper for asyncio.Queue.get
+        Async iterator of get_batch results, forever
         """
-        return await self._outqueue.get()
+        while True:
+            yield await self.get_batch(max_items, max_wait)
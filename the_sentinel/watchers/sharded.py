@@ -0,0 +1,217 @@
+"""
+Spreads subreddit watching across several processes, each with its own event
+loop and praw instance, for when one core can't keep up
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, \
+                   Tuple, Union
+import asyncio
+import multiprocessing
+import queue
+import zlib
+import praw
+from .reddit import RedditWatcher
+
+# commands sent down to shards, (command, subreddit)
+Command = Tuple[str, Optional[str]]
+# seconds get() sleeps between looks at an empty results queue
+POLL_DELAY = 0.01
+
+
+class ShardSpec(NamedTuple):
+    """
+    Everything a shard process needs to start watching
+    """
+    reddit_kwargs: Dict[str, Any]
+    subreddits: Set[str]
+    item_callback: Callable[[Any], Any]
+    stream_kwargs: Dict[str, Any]
+
+
+def shard_for(subreddit: str, shards: int) -> int:
+    """
+    Stable (across processes and runs, unlike hash()) shard for a subreddit
+    """
+    return zlib.crc32(subreddit.lower().encode('utf-8')) % shards
+
+
+def fullname(item: Any) -> str:
+    """
+    Default item callback for shards. Whatever the callback returns has to be
+    pickled to get back to the parent process, and fullnames are cheap to send
+    and easy to turn back into objects with reddit.info
+    """
+    return str(item.fullname)
+
+
+def _run_shard(spec: ShardSpec, commands: Any,
+               results: Any): # pragma: no cover
+    """
+    Entry point of a shard process. Runs a normal RedditWatcher and forwards
+    everything it gets to the shared results queue until told to stop
+    """
+    # runs in a child process, covered by the tests of the pieces it uses
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    watcher = RedditWatcher(praw.Reddit(**spec.reddit_kwargs))
+
+    def start(subreddit):
+        loop.create_task(watcher.add_watcher(subreddit).watch(
+            item_callback=spec.item_callback, **spec.stream_kwargs))
+
+    async def forward():
+        while True:
+            results.put(await watcher.get())
+
+    async def listen():
+        while True:
+            command, subreddit = await loop.run_in_executor(None,
+                                                            commands.get)
+            if command == 'add':
+                start(subreddit)
+            elif command == 'remove':
+                watcher.remove_watcher(subreddit)
+            else:
+                watcher.kill()
+                return
+
+    for subreddit in spec.subreddits:
+        start(subreddit)
+    loop.create_task(forward())
+    loop.run_until_complete(listen())
+
+
+class ShardedRedditWatcher:
+    """
+    RedditWatcher spread across `shards` worker processes. Subreddits are
+    hashed onto shards, and everything the shards see comes back through a
+    single queue read with get().
+
+    reddit_kwargs is either one dict of praw.Reddit arguments used by every
+    shard, or a list of them handed out round robin. Each shard has its own
+    praw instance, so giving shards different oauth apps gives each one its
+    own rate limit instead of all of them sharing one.
+
+    item_callback runs inside the shards and its return value must be
+    picklable (the default returns the item's fullname)
+    """
+    # pylint: disable=too-many-instance-attributes
+    # (per shard bookkeeping on top of the settings)
+    def __init__(self,
+                 reddit_kwargs: Union[Dict[str, Any], List[Dict[str, Any]]],
+                 shards: Optional[int] = None,
+                 item_callback: Callable[[Any], Any] = fullname,
+                 context: Optional[str] = None,
+                 poll_interval: float = 1):
+        if isinstance(reddit_kwargs, dict):
+            reddit_kwargs = [reddit_kwargs]
+        self.reddit_kwargs = reddit_kwargs
+        self.shards = shards or multiprocessing.cpu_count()
+        self.item_callback = item_callback
+        self.poll_interval = poll_interval
+
+        # typeshed's BaseContext doesn't know about Process
+        self._ctx: Any = multiprocessing.get_context(context)
+        self.results = self._ctx.Queue()
+        self.subreddits: List[Set[str]]
+        self.subreddits = [set() for _ in range(self.shards)]
+        self._workers: List[Optional[multiprocessing.process.BaseProcess]]
+        self._workers = [None] * self.shards
+        self._commands: List[Optional[Any]]
+        self._commands = [None] * self.shards
+        self._stream_kwargs: Optional[Dict[str, Any]] = None
+
+    def add_watcher(self, subreddit: str):
+        """
+        Adds a subreddit, starting it right away if we're already watching
+        """
+        shard = shard_for(subreddit, self.shards)
+        if subreddit.lower() in self.subreddits[shard]:
+            raise RuntimeError(
+                "You may not have multiple watchers for a single subreddit")
+        self.subreddits[shard].add(subreddit.lower())
+        self._send(shard, ('add', subreddit.lower()))
+
+    def remove_watcher(self, subreddit: str):
+        """
+        Stops watching a subreddit
+        """
+        shard = shard_for(subreddit, self.shards)
+        if subreddit.lower() not in self.subreddits[shard]:
+            raise RuntimeError(f"No watcher for {subreddit}")
+        self.subreddits[shard].remove(subreddit.lower())
+        self._send(shard, ('remove', subreddit.lower()))
+
+    def watch(self, **kwargs: Any):
+        """
+        Starts every shard, passing down stream arguments
+        """
+        self._stream_kwargs = kwargs
+        for shard in range(self.shards):
+            self._start(shard)
+
+    def check_workers(self) -> List[int]:
+        """
+        Restarts any shards that have died. Returns the restarted shards
+        """
+        if self._stream_kwargs is None:
+            return []
+        dead = [shard for shard, worker in enumerate(self._workers)
+                if worker is not None and not worker.is_alive()]
+        for shard in dead:
+            self._start(shard)
+        return dead
+
+    def kill(self, timeout: float = 5):
+        """
+        Stops every shard, forcibly if they don't stop within timeout seconds
+        """
+        self._stream_kwargs = None
+        for shard in range(self.shards):
+            self._send(shard, ('stop', None))
+        for worker in self._workers:
+            if worker is None:
+                continue
+            worker.join(timeout)
+            if worker.is_alive():
+                worker.terminate()
+        self._workers = [None] * self.shards
+        self._commands = [None] * self.shards
+
+    async def get(self) -> Any:
+        """
+        Gets the next result from any shard, checking for dead shards every
+        poll_interval seconds while waiting. Polls the results queue instead
+        of blocking a thread on it, so a cancelled get() never takes an item
+        """
+        loop = asyncio.get_event_loop()
+        checked: Optional[float] = None
+        while True:
+            if checked is None or loop.time() - checked >= self.poll_interval:
+                self.check_workers()
+                checked = loop.time()
+            try:
+                return self.results.get_nowait()
+            except queue.Empty:
+                await asyncio.sleep(POLL_DELAY)
+
+    def _send(self, shard: int, command: Command):
+        commands = self._commands[shard]
+        if commands is not None:
+            commands.put(command)
+
+    def _start(self, shard: int):
+        # a fresh command queue every time, a crashed shard can leave the old
+        # one in a broken state. Anything in subreddits is started on launch
+        # so nothing queued for the old one is lost
+        commands = self._ctx.Queue()
+        worker = self._ctx.Process(
+            target=_run_shard,
+            args=(ShardSpec(
+                self.reddit_kwargs[shard % len(self.reddit_kwargs)],
+                set(self.subreddits[shard]),
+                self.item_callback,
+                self._stream_kwargs or {}), commands, self.results),
+            daemon=True)
+        worker.start()
+        self._commands[shard] = commands
+        self._workers[shard] = worker